@@ -1,36 +1,152 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, abort
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, abort, Response
 import smtplib
 import mimetypes
 from email import encoders
+from email.message import Message
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
+from email.generator import BytesGenerator
+from email.utils import parseaddr
+from html import escape as html_escape
+from html.parser import HTMLParser
+import base64
+import cProfile
+import csv
+import gzip
+import hashlib
+import io
 import json
 import os
+import pstats
+import queue
+import random
 import re
+import socket
 import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import groupby
+from typing import NamedTuple
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 쓰기 잠금 없이 SQLite busy_timeout에 맡김
+    fcntl = None
+try:
+    import resource
+except ImportError:  # Windows: 드라이런 보고서에서 최대 메모리는 빠짐
+    resource = None
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+except ImportError:  # DKIM 서명을 켤 때만 필요
+    serialization = None
+try:
+    from PIL import Image
+except ImportError:  # 템플릿 이미지 썸네일을 만들 때만 필요 (없으면 원본을 그대로 보여줌)
+    Image = None
 from werkzeug.utils import secure_filename
 from redis import Redis
-from rq import Queue
-from datetime import datetime
+from rq import Queue, SimpleWorker
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from datetime import datetime, timedelta
 import uuid
+import zlib
+import click
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
 
 # 데이터 저장을 위한 디렉토리
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(BASE_DIR, 'data')
 TEMPLATES_DIR = os.path.join(DATA_DIR, 'templates')
 RESULTS_DIR = os.path.join(DATA_DIR, 'results')
 DB_FILE = os.path.join(DATA_DIR, 'app.db')
 ASSETS_DIR = os.path.join(DATA_DIR, 'assets')
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+
+# 한 SMTP 트랜잭션에 싣는 최대 RCPT TO 수 (RFC 5321 최소 보장치 100)
+SMTP_MAX_RCPT_PER_TX = int(os.environ.get('SMTP_MAX_RCPT_PER_TX') or '100')
+
+# 발송 프로파일링: PROFILE_MODE=message면 PROFILE_EVERY번째 메시지마다 cProfile,
+# sample이면 청크 내내 PROFILE_SAMPLE_MS 간격으로 스택을 샘플링해 data/profiles/<run_id>.*에 run별로 누적
+PROFILE_MODE = (os.environ.get('PROFILE_MODE') or '').lower()
+PROFILE_EVERY = int(os.environ.get('PROFILE_EVERY') or '100')
+PROFILE_SAMPLE_MS = float(os.environ.get('PROFILE_SAMPLE_MS') or '5')
+
+# Gmail은 HTML 본문이 이 크기를 넘으면 잘라서 보여줌 (발송 화면 경고 기준)
+HTML_CLIP_BYTES = 102 * 1024
+
+# DKIM 서명: DKIM_PRIVATE_KEY(PEM, RSA 또는 Ed25519)가 있을 때만 켜짐. d=는 DKIM_DOMAIN, 없으면 보내는 주소의 도메인
+DKIM_PRIVATE_KEY = os.environ.get('DKIM_PRIVATE_KEY') or ''
+DKIM_SELECTOR = os.environ.get('DKIM_SELECTOR') or 'default'
+DKIM_DOMAIN = os.environ.get('DKIM_DOMAIN') or ''
+DKIM_SIGNED_HEADERS = ('from', 'to', 'subject', 'mime-version', 'content-type')
+RUN_PAYLOAD_CACHE_MAX = 4
+
+# 일시적 실패(4xx/네트워크 장애) 자동 재시도 정책
+RETRY_MAX_ATTEMPTS = int(os.environ.get('RETRY_MAX_ATTEMPTS') or '5')
+RETRY_BASE_DELAY = int(os.environ.get('RETRY_BASE_DELAY') or '60')
+RETRY_MAX_DELAY = int(os.environ.get('RETRY_MAX_DELAY') or '3600')
+RETRY_BATCH_SIZE = int(os.environ.get('RETRY_BATCH_SIZE') or '200')
+RETRY_CLAIM_TTL = 600
+
+# 워커 장애 감지: run lease 유효 시간(초). 청크를 처리하는 동안 백그라운드 스레드가 TTL/3 마다 갱신
+RUN_LEASE_TTL = int(os.environ.get('RUN_LEASE_TTL') or '120')
+SMTP_TIMEOUT = int(os.environ.get('SMTP_TIMEOUT') or '60')
+
+# 워커 프로세스 안에서 재사용하는 SMTP 세션 풀(설정별)
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE') or '4')
+SMTP_POOL_MAX_IDLE = int(os.environ.get('SMTP_POOL_MAX_IDLE') or '300')
+SMTP_POOL_CHECK_AFTER = 30
+REAPER_LOCK_KEY = 'webmailsender:reaper-scheduled'
+
+# run은 청크(RUN_CHUNK_SIZE x weight 명) 단위로 큐에 들어가며, 청크가 끝나면 같은 우선순위 큐의
+# 맨 뒤로 다시 들어가 다른 run과 번갈아 처리됨. 워커는 RUN_PRIORITIES 순서대로 큐를 소비
+RUN_CHUNK_SIZE = int(os.environ.get('RUN_CHUNK_SIZE') or '100')
+RUN_PRIORITIES = ('transactional', 'test', 'bulk')
+RUN_MAX_WEIGHT = 10
+
+# 보관 정책: 완료 후 RETENTION_DAYS일이 지난 run은 data/archive/<run_id>.jsonl.gz로 옮기고 DB 행을 지움 (0이면 끔)
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS') or '0')
+ARCHIVE_INTERVAL = 24 * 3600
+ARCHIVE_DELETE_BATCH = int(os.environ.get('ARCHIVE_DELETE_BATCH') or '5000')
+ARCHIVE_VACUUM_PAGES = 1000
+ARCHIVER_LOCK_KEY = 'webmailsender:archiver-scheduled'
+
+# run_recipients.status 정수 코드
+RCPT_PENDING, RCPT_SENT, RCPT_FAILED = 0, 1, 2
+RCPT_STATUS_CODES = {'pending': RCPT_PENDING, 'sent': RCPT_SENT, 'failed': RCPT_FAILED}
+RCPT_STATUS_NAMES = {v: k for k, v in RCPT_STATUS_CODES.items()}
+# 결과 상세 화면의 수신자 목록 한 페이지 행 수 (전체는 내보내기로 받음)
+RESULT_PAGE_SIZE = int(os.environ.get('RESULT_PAGE_SIZE') or '500')
+
+# DB 쓰기는 프로세스마다 하나인 writer 스레드가 모아서 한 트랜잭션으로 반영 (0이면 호출한 스레드에서 직접 씀)
+DB_WRITE_JOURNAL = (os.environ.get('DB_WRITE_JOURNAL') or '1').lower() not in ('0', 'false', 'no', 'off')
+DB_WRITE_BATCH_MAX = int(os.environ.get('DB_WRITE_BATCH_MAX') or '200')
+# writer가 쓰기 하나를 끝내기를 기다리는 최대 시간(초). 넘기면 호출한 쪽에 오류를 냄
+DB_WRITE_TIMEOUT = float(os.environ.get('DB_WRITE_TIMEOUT') or '60')
+
+# 상주 워커(`flask --app app worker`)가 미리 읽어 두는 인라인 이미지 캐시 상한(바이트)
+ASSET_CACHE_MAX_BYTES = int(os.environ.get('ASSET_CACHE_MAX_BYTES') or str(64 * 1024 * 1024))
+
+# 편집기 목록에 쓰는 템플릿 이미지 썸네일의 긴 변(px, 0이면 만들지 않음)과 해시가 붙은 이미지 주소의 브라우저 캐시 시간(초)
+ASSET_THUMB_SIZE = int(os.environ.get('ASSET_THUMB_SIZE') or '320')
+ASSET_MAX_AGE = int(os.environ.get('ASSET_MAX_AGE') or str(365 * 24 * 3600))
 
 # 디렉토리 생성
 os.makedirs(TEMPLATES_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 os.makedirs(ASSETS_DIR, exist_ok=True)
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
 
 def _now_iso() -> str:
@@ -66,17 +182,239 @@ def _get_template_assets_dir(template_id: str) -> str:
     return os.path.join(ASSETS_DIR, template_id)
 
 
-def _list_template_assets(template_id: str) -> list[dict]:
+_asset_listing_cache: dict[str, tuple[int, list[str]]] = {}
+_asset_bytes_cache: dict[str, tuple[tuple[int, int], bytes]] = {}
+_asset_cache_lock = threading.Lock()
+
+
+def _asset_filenames(template_id: str) -> list[str]:
+    """템플릿 이미지 폴더의 파일 목록 (폴더 mtime이 바뀌면 다시 읽음)"""
     base = _get_template_assets_dir(template_id)
-    if not os.path.isdir(base):
+    try:
+        stamp = os.stat(base).st_mtime_ns
+    except OSError:
         return []
-    assets = []
-    for fn in sorted(os.listdir(base)):
-        p = os.path.join(base, fn)
-        if not os.path.isfile(p):
+    cached = _asset_listing_cache.get(base)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    names = sorted(fn for fn in os.listdir(base) if os.path.isfile(os.path.join(base, fn)))
+    _asset_listing_cache[base] = (stamp, names)
+    return names
+
+
+def _read_asset(file_path: str) -> bytes:
+    """이미지 파일 내용 (mtime/크기가 그대로면 메모리 캐시 사용)"""
+    st = os.stat(file_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _asset_bytes_cache.get(file_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    with _asset_cache_lock:
+        used = sum(len(v[1]) for k, v in _asset_bytes_cache.items() if k != file_path)
+        if used + len(data) <= ASSET_CACHE_MAX_BYTES:
+            _asset_bytes_cache[file_path] = (stamp, data)
+    return data
+
+
+def invalidate_asset_cache(template_id: str | None = None):
+    """업로드/삭제/템플릿 저장 시 해당 템플릿(없으면 전체)의 이미지 캐시를 비움"""
+    with _asset_cache_lock:
+        if template_id is None:
+            _asset_listing_cache.clear()
+            _asset_bytes_cache.clear()
+            _asset_index_cache.clear()
+            return
+        base = _get_template_assets_dir(template_id)
+        _asset_listing_cache.pop(base, None)
+        _asset_index_cache.pop(base, None)
+        for path in [p for p in _asset_bytes_cache if os.path.dirname(p) == base]:
+            _asset_bytes_cache.pop(path, None)
+
+
+def preload_asset_cache() -> int:
+    """상주 워커 시작 시 모든 템플릿 이미지를 캐시에 올림. 올린 파일 수를 반환"""
+    loaded = 0
+    if not os.path.isdir(ASSETS_DIR):
+        return loaded
+    for template_id in sorted(os.listdir(ASSETS_DIR)):
+        if not os.path.isdir(_get_template_assets_dir(template_id)):
             continue
-        cid, _ = os.path.splitext(fn)
-        assets.append({'cid': cid, 'filename': fn})
+        for fn in _asset_filenames(template_id):
+            path = os.path.join(_get_template_assets_dir(template_id), fn)
+            try:
+                _read_asset(path)
+            except OSError:
+                continue
+            if path in _asset_bytes_cache:
+                loaded += 1
+    return loaded
+
+
+# 이미지 폴더 안의 색인/썸네일 보관 폴더 (파일 목록에는 파일만 잡히므로 이미지로 보이지 않음)
+ASSET_CACHE_SUBDIR = '.cache'
+_THUMB_FORMATS = {'JPEG': ('JPEG', '.jpg'), 'PNG': ('PNG', '.png'), 'GIF': ('PNG', '.png'), 'WEBP': ('WEBP', '.webp')}
+_asset_index_cache: dict[str, tuple[int, dict]] = {}
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_atomic(path: str, write):
+    """같은 폴더의 고유한 임시 파일에 write(f)로 쓴 뒤 교체 (여러 스레드/프로세스가 같은 파일을 써도 임시 파일이 겹치지 않음)"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _make_thumbnail(src: str, cache_dir: str, digest: str) -> str | None:
+    """ASSET_THUMB_SIZE보다 큰 래스터 이미지의 축소본을 만들고 파일 이름을 반환 (Pillow가 없으면 None)"""
+    if Image is None or ASSET_THUMB_SIZE <= 0:
+        return None
+    try:
+        with Image.open(src) as img:
+            if img.format not in _THUMB_FORMATS or max(img.size) <= ASSET_THUMB_SIZE:
+                return None
+            fmt, ext = _THUMB_FORMATS[img.format]
+            # 크기 설정이 바뀌면 이름도 바뀌어 이전 크기의 썸네일을 재사용하지 않음
+            name = f'{digest[:16]}-{ASSET_THUMB_SIZE}{ext}'
+            path = os.path.join(cache_dir, name)
+            if os.path.exists(path):
+                return name
+            img.thumbnail((ASSET_THUMB_SIZE, ASSET_THUMB_SIZE))
+            if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            _write_atomic(path, lambda f: img.save(f, format=fmt))
+            return name
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        app.logger.warning('썸네일 생성 실패 %s: %s', src, e)
+        return None
+
+
+def _asset_files_unchanged(base: str, entries: dict[str, dict]) -> bool:
+    """색인의 파일마다 크기/mtime이 그대로인지. 제자리에서 덮어쓴 파일은 폴더 mtime을 바꾸지 않으므로 따로 확인"""
+    for fn, entry in entries.items():
+        try:
+            st = os.stat(os.path.join(base, fn))
+        except OSError:
+            return False
+        if st.st_size != entry['size'] or st.st_mtime_ns != entry['mtime_ns']:
+            return False
+    return True
+
+
+def _asset_index(template_id: str, refresh: bool = False) -> dict[str, dict]:
+    """템플릿 이미지 색인 {파일 이름: {cid, size, mtime_ns, hash, thumb}}
+
+    `.cache/index.json`에 저장해 두고 폴더 mtime과 파일마다의 크기/mtime이 같으면 그대로 씀.
+    다시 만들 때도 크기/mtime이 같은 파일은 해시와 썸네일을 재사용하고 바뀐 파일만 읽음.
+    """
+    base = _get_template_assets_dir(template_id)
+    if not os.path.isdir(base):
+        return {}
+    cache_dir = os.path.join(base, ASSET_CACHE_SUBDIR)
+    os.makedirs(cache_dir, exist_ok=True)  # 폴더 mtime을 재기 전에 만들어 둠
+    stamp = os.stat(base).st_mtime_ns
+    cached = _asset_index_cache.get(base)
+    if cached and cached[0] == stamp and not refresh and _asset_files_unchanged(base, cached[1]):
+        return cached[1]
+
+    index_path = os.path.join(cache_dir, 'index.json')
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+    thumb_size = ASSET_THUMB_SIZE if Image is not None else 0
+    if (
+        stored.get('dir_mtime_ns') == stamp and stored.get('thumb_size') == thumb_size and not refresh
+        and _asset_files_unchanged(base, stored.get('assets') or {})
+    ):
+        entries = stored.get('assets') or {}
+    else:
+        previous = stored.get('assets') or {}
+        same_thumbs = stored.get('thumb_size') == thumb_size
+        entries = {}
+        for fn in _asset_filenames(template_id):
+            path = os.path.join(base, fn)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            old = previous.get(fn)
+            if old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+                entry = dict(old)
+                if not same_thumbs:
+                    entry['thumb'] = _make_thumbnail(path, cache_dir, entry['hash'])
+            else:
+                digest = _file_sha256(path)
+                entry = {
+                    'cid': os.path.splitext(fn)[0],
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'hash': digest,
+                    'thumb': _make_thumbnail(path, cache_dir, digest),
+                }
+            entries[fn] = entry
+        # 지워졌거나 바뀐 이미지의 썸네일 정리
+        keep = {e['thumb'] for e in entries.values() if e['thumb']} | {'index.json'}
+        for fn in os.listdir(cache_dir):
+            if fn not in keep and not fn.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(cache_dir, fn))
+                except OSError:
+                    pass
+        data = json.dumps({'dir_mtime_ns': stamp, 'thumb_size': thumb_size, 'assets': entries}, ensure_ascii=False)
+        _write_atomic(index_path, lambda f: f.write(data.encode('utf-8')))
+
+    with _asset_cache_lock:
+        _asset_index_cache[base] = (stamp, entries)
+    return entries
+
+
+def _asset_entry(template_id: str, cid: str) -> tuple[str, dict] | None:
+    """cid에 맞는 (파일 이름, 색인 항목). 파일 이름이 정확히 같은 것을 먼저 고름 (_find_inline_image_path와 같은 순서)"""
+    index = _asset_index(template_id)
+    if cid in index:
+        return cid, index[cid]
+    for fn in sorted(index):
+        if os.path.splitext(fn)[0] == cid:
+            return fn, index[fn]
+    return None
+
+
+def _asset_version(entry: dict, thumb: bool = False) -> str:
+    """?v= 값. 썸네일은 크기 설정(ASSET_THUMB_SIZE)까지 넣어 설정이 바뀌면 주소도 바뀜"""
+    if thumb and entry['thumb']:
+        return f"{entry['hash']}-{ASSET_THUMB_SIZE}"
+    return entry['hash']
+
+
+def _list_template_assets(template_id: str) -> list[dict]:
+    assets = []
+    for fn, entry in sorted(_asset_index(template_id).items()):
+        assets.append({
+            'cid': entry['cid'],
+            'filename': fn,
+            'size': entry['size'],
+            'hash': entry['hash'],
+            'thumb': bool(entry['thumb']),
+            'version': _asset_version(entry, thumb=True),
+        })
     return assets
 
 
@@ -97,21 +435,12 @@ def _find_inline_image_path(template_id: str, cid: str) -> str | None:
     if not template_id:
         return None
     base = os.path.join(ASSETS_DIR, template_id)
-    if not os.path.isdir(base):
-        return None
 
     candidates = []
-    direct = os.path.join(base, cid)
-    if os.path.isfile(direct):
-        candidates.append(direct)
-
-    for fn in os.listdir(base):
-        path = os.path.join(base, fn)
-        if not os.path.isfile(path):
-            continue
+    for fn in _asset_filenames(template_id):
         stem, _ = os.path.splitext(fn)
-        if stem == cid:
-            candidates.append(path)
+        if fn == cid or stem == cid:
+            candidates.append(os.path.join(base, fn))
 
     if not candidates:
         return None
@@ -124,9 +453,7 @@ def _attach_inline_image(related_msg: MIMEMultipart, cid: str, file_path: str):
     ctype = ctype or 'application/octet-stream'
     maintype, subtype = ctype.split('/', 1) if '/' in ctype else ('application', 'octet-stream')
 
-    with open(file_path, 'rb') as f:
-        data = f.read()
-
+    data = _read_asset(file_path)
     filename = os.path.basename(file_path)
 
     if maintype == 'image' and subtype not in ('svg+xml',):
@@ -141,23 +468,438 @@ def _attach_inline_image(related_msg: MIMEMultipart, cid: str, file_path: str):
     related_msg.attach(part)
 
 
+_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'center', 'dd', 'div', 'dl', 'dt', 'footer',
+    'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hr', 'html', 'li', 'link', 'meta',
+    'nav', 'ol', 'p', 'section', 'style', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title',
+    'tr', 'ul',
+))
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'))
+_RAW_TEXT_TAGS = frozenset(('pre', 'textarea', 'script', 'style'))
+_UNSTYLED_TAGS = frozenset(('base', 'br', 'head', 'html', 'link', 'meta', 'script', 'style', 'title'))
+_WS_RE = re.compile(r'\s+')
+
+
+class _PreText(str):
+    """<pre> 안의 텍스트 조각: 공백/줄바꿈을 줄이지 않고 그대로 씀"""
+
+
+class _PlainTextConverter(HTMLParser):
+    """HTML을 한 번 훑으며 텍스트 대체 본문을 만듦 (블록 태그는 줄바꿈, 링크는 주소를 괄호로 덧붙임)"""
+
+    _SKIP_TAGS = frozenset(('head', 'script', 'style', 'title'))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.skip = 0
+        self.pre = 0
+        self.pre_start = False
+        self.links: list[str | None] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self.skip += 1
+        elif tag == 'pre':
+            self.parts.append('\n')
+            self.pre += 1
+            self.pre_start = True
+        elif tag == 'br':
+            self.parts.append(_PreText('\n') if self.pre else '\n')
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag == 'a':
+            self.links.append(dict(attrs).get('href'))
+        elif tag == 'img':
+            alt = dict(attrs).get('alt')
+            if alt and not self.skip:
+                self.parts.append(alt)
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag == 'pre':
+            self.pre = max(0, self.pre - 1)
+            self.parts.append('\n')
+        elif tag in _BLOCK_TAGS and tag != 'li':
+            self.parts.append('\n')
+        elif tag == 'a' and self.links:
+            href = self.links.pop()
+            if href and href.startswith(('http://', 'https://')) and not self.skip:
+                self.parts.append(f' ({href})')
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.pre:
+            # 브라우저와 같이 <pre> 바로 뒤의 줄바꿈 하나는 버림
+            if self.pre_start and data.startswith('\n'):
+                data = data[1:]
+            self.pre_start = False
+            self.parts.append(_PreText(data))
+        else:
+            self.parts.append(_WS_RE.sub(' ', data))
+
+    def text(self) -> str:
+        # [줄, <pre> 줄 여부]. 조각 경계는 줄 중간일 수 있으므로 각 묶음의 첫 조각은 앞 줄에 이어 붙임
+        lines: list[list] = [['', False]]
+        for preformatted, group in groupby(self.parts, key=lambda p: isinstance(p, _PreText)):
+            first, *rest = ''.join(group).split('\n')
+            lines[-1][0] += first
+            lines[-1][1] = lines[-1][1] or (preformatted and bool(first))
+            lines.extend([line, preformatted] for line in rest)
+        out: list[str] = []
+        for line, preformatted in lines:
+            if not preformatted:
+                line = _WS_RE.sub(' ', line).strip()
+                if not line and not (out and out[-1]):
+                    continue
+            out.append(line)
+        return '\n'.join(out).strip('\n')
+
+
 def _html_to_plain_text(html: str) -> str:
     if not html:
         return ''
-    text = re.sub(r'<\s*br\s*/?>', '\n', html, flags=re.IGNORECASE)
-    text = re.sub(r'</p\s*>', '\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'<[^>]+>', '', text)
-    return text.strip()
+    converter = _PlainTextConverter()
+    converter.feed(html)
+    converter.close()
+    return converter.text()
+
+
+# 컴파일 결과 형식/규칙이 바뀌면 올림 (저장된 결과가 다른 버전이면 다시 컴파일)
+TEMPLATE_COMPILE_VERSION = 3
+_STYLE_BLOCK_RE = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.IGNORECASE | re.DOTALL)
+_CONDITIONAL_COMMENT_RE = re.compile(r'<!--\[if.*?<!\[endif\]-->', re.IGNORECASE | re.DOTALL)
+_HEAD_END_RE = re.compile(r'</head\s*>', re.IGNORECASE)
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_SIMPLE_SELECTOR_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9]*|\*)?((?:[.#][\w-]+)*)$')
+_COMBINATOR_RE = re.compile(r'\s*>\s*|\s+')
+# 여는 태그만 있고 닫는 태그를 생략하는 요소: 같은 태그가 다시 열리면 앞의 것을 닫은 것으로 봄
+_IMPLIED_END_TAGS = frozenset(('dd', 'dt', 'li', 'option', 'p', 'td', 'th', 'tr'))
+
+
+def _split_css_declarations(body: str) -> list[tuple[str, str]]:
+    """'a: b; c: d' -> [('a', 'b'), ('c', 'd')] (괄호/따옴표 안의 ;는 나누지 않음)"""
+    out = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(body + ';'):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ('"', "'"):
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        elif ch == ';' and depth == 0:
+            name, sep, value = body[start:i].partition(':')
+            if sep and name.strip() and value.strip():
+                out.append((name.strip().lower(), _WS_RE.sub(' ', value.strip())))
+            start = i + 1
+    return out
+
+
+def _is_important(value: str) -> bool:
+    return value.replace(' ', '').lower().endswith('!important')
+
+
+def _parse_selector(selector: str) -> tuple | None:
+    """'table td.x' / 'ul > li' -> 오른쪽(대상 요소)부터의 단계 ((조합자, 태그, 클래스, id), ...)
 
+    태그/클래스/id와 자손(공백)/자식(>) 조합자로만 된 선택자만 다루고, 나머지(:hover, [속성], +, ~ 등)는 None
+    """
+    if not selector or selector[0] == '>' or selector[-1] == '>':
+        return None
+    compounds = _COMBINATOR_RE.split(selector)
+    combinators = [c.strip() or ' ' for c in _COMBINATOR_RE.findall(selector)]
+    steps = []
+    for compound, combinator in zip(reversed(compounds), combinators[::-1] + [None]):
+        m = _SIMPLE_SELECTOR_RE.match(compound)
+        if not compound or not m:
+            return None
+        parts = re.findall(r'[.#][\w-]+', m.group(2))
+        ids = {p[1:] for p in parts if p[0] == '#'}
+        if len(ids) > 1:
+            return None
+        tag = (m.group(1) or '*').lower()
+        steps.append((combinator, tag, frozenset(p[1:] for p in parts if p[0] == '.'), next(iter(ids), None)))
+    return tuple(steps)
+
+
+def _compound_matches(step: tuple, node: tuple) -> bool:
+    _, tag, classes, element_id = step
+    return (tag == '*' or tag == node[0]) and classes <= node[1] and (element_id is None or element_id == node[2])
+
+
+def _selector_matches(steps: tuple, node: tuple, ancestors: list[tuple], i: int = 0) -> bool:
+    """steps[i]가 node에 맞고, 그 왼쪽 단계들이 ancestors(바깥→안쪽 순)에 맞는지"""
+    if not _compound_matches(steps[i], node):
+        return False
+    if i + 1 == len(steps):
+        return True
+    if steps[i][0] == '>':
+        return bool(ancestors) and _selector_matches(steps, ancestors[-1], ancestors[:-1], i + 1)
+    return any(
+        _selector_matches(steps, ancestors[j], ancestors[:j], i + 1)
+        for j in range(len(ancestors) - 1, -1, -1)
+    )
+
+
+def _parse_css(css: str) -> tuple[list[tuple], list[str]]:
+    """<style> 내용 -> (인라인할 규칙 [(특이도, 순서, 선택자 단계, 선언)], 남겨 둘 규칙 문자열)
+
+    태그/클래스/id와 자손/자식 조합자로 된 선택자는 인라인하고(특이도대로 겹침을 풀어야 하므로 함께 인라인),
+    @media나 :hover, 속성 선택자 같은 것은 <style>에 남김
+    """
+    css = _CSS_COMMENT_RE.sub('', css)
+    rules = []
+    keep = []
+    depth = 0
+    start = 0
+    prelude = ''
+    body_start = 0
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0:
+                prelude = css[start:i]
+                body_start = i + 1
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth:
+                continue
+            # '@import ...;' 같은 블록 없는 문장은 그대로 남김
+            statements, _, prelude = prelude.rpartition(';')
+            keep.extend(f'{st.strip()};' for st in statements.split(';') if st.strip())
+            prelude = _WS_RE.sub(' ', prelude).strip()
+            body = css[body_start:i]
+            start = i + 1
+            if prelude.startswith('@'):
+                keep.append(f'{prelude}{{{_WS_RE.sub(" ", body).strip()}}}')
+                continue
+            decls = _split_css_declarations(body)
+            if not decls:
+                continue
+            for selector in (sel.strip() for sel in prelude.split(',')):
+                steps = _parse_selector(selector)
+                if not steps:
+                    keep.append(f'{selector}{{{";".join(f"{k}:{v}" for k, v in decls)}}}')
+                    continue
+                specificity = (
+                    sum(st[3] is not None for st in steps),
+                    sum(len(st[2]) for st in steps),
+                    sum(st[1] != '*' for st in steps),
+                )
+                rules.append((specificity, len(rules), steps, decls))
+    return rules, keep
+
+
+class _TemplateCompiler(HTMLParser):
+    """CSS 규칙을 style 속성으로 인라인하면서 주석/공백을 줄여 HTML을 다시 씀"""
+
+    def __init__(self, rules: list[tuple]):
+        super().__init__(convert_charrefs=False)
+        self.rules = rules
+        # 열려 있는 조상 요소 (태그, 클래스, id). 자손/자식 선택자 판정에 씀
+        self.ancestors: list[tuple] = []
+        self.out: list[str] = []
+        self.raw_depth = 0
+        self.pending_space = False
+        self.last_block = True
+
+    def _node(self, tag: str, attrs: list) -> tuple:
+        attr_map = dict(attrs)
+        return (tag, frozenset((attr_map.get('class') or '').split()), attr_map.get('id'))
+
+    def _styled(self, tag: str, attrs: list) -> list:
+        if not self.rules or tag in _UNSTYLED_TAGS:
+            return attrs
+        attr_map = dict(attrs)
+        node = self._node(tag, attrs)
+        matched = sorted(
+            (r[0], r[1], r[3]) for r in self.rules if _selector_matches(r[2], node, self.ancestors)
+        )
+        if not matched:
+            return attrs
+        merged: dict[str, str] = {}
+        important = set()
+        for rule in matched:
+            for name, value in rule[2]:
+                if _is_important(value):
+                    important.add(name)
+                elif name in important:
+                    continue
+                merged[name] = value
+        # 원래 style 속성이 스타일시트 규칙보다 우선 (스타일시트의 !important는 제외)
+        for name, value in _split_css_declarations(attr_map.get('style') or ''):
+            if name not in important or _is_important(value):
+                merged[name] = value
+        style = ';'.join(f'{k}:{v}' for k, v in merged.items())
+        return [(k, v) for k, v in attrs if k != 'style'] + [('style', style)]
+
+    def _flush_space(self, tag: str | None = None):
+        if self.pending_space and not self.last_block and tag not in _BLOCK_TAGS:
+            self.out.append(' ')
+        self.pending_space = False
+
+    def _emit_tag(self, tag: str, attrs: list, self_closing: bool = False):
+        self._flush_space(tag)
+        text = '<' + tag
+        for k, v in attrs:
+            text += f' {k}' if v is None else f' {k}="{html_escape(v, quote=True)}"'
+        self.out.append(text + (' />' if self_closing else '>'))
+        self.last_block = tag in _BLOCK_TAGS
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _IMPLIED_END_TAGS and self.ancestors and self.ancestors[-1][0] == tag:
+            self.ancestors.pop()
+        self._emit_tag(tag, self._styled(tag, attrs))
+        if tag not in _VOID_TAGS:
+            self.ancestors.append(self._node(tag, attrs))
+        if tag in _RAW_TEXT_TAGS:
+            self.raw_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._emit_tag(tag, self._styled(tag, attrs), self_closing=True)
+
+    def handle_endtag(self, tag):
+        if tag in _RAW_TEXT_TAGS:
+            self.raw_depth = max(0, self.raw_depth - 1)
+        if tag in _VOID_TAGS:
+            return
+        # 안쪽에서 닫지 않은 요소가 있으면 함께 닫음 (짝이 없는 닫는 태그는 무시)
+        for i in range(len(self.ancestors) - 1, -1, -1):
+            if self.ancestors[i][0] == tag:
+                del self.ancestors[i:]
+                break
+        self._flush_space(tag)
+        self.out.append(f'</{tag}>')
+        self.last_block = tag in _BLOCK_TAGS
+
+    def handle_data(self, data):
+        if self.raw_depth:
+            self.out.append(data)
+            return
+        collapsed = _WS_RE.sub(' ', data)
+        if not collapsed.strip():
+            self.pending_space = self.pending_space or bool(collapsed)
+            return
+        if collapsed[0] == ' ':
+            self.pending_space = True
+            collapsed = collapsed[1:]
+        self._flush_space()
+        if collapsed.endswith(' '):
+            collapsed = collapsed[:-1]
+            self.pending_space = True
+        self.out.append(collapsed)
+        self.last_block = False
+
+    def handle_entityref(self, name):
+        self.handle_data(f'&{name};')
+
+    def handle_charref(self, name):
+        self.handle_data(f'&#{name};')
+
+    def handle_comment(self, data):
+        # Outlook 조건부 주석만 남김
+        if data.startswith('[if') or data.endswith('<![endif]'):
+            self._flush_space()
+            self.out.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.out.append(f'<!{decl}>')
+
+    def unknown_decl(self, data):
+        self.out.append(f'<![{data}]>')
+
+    def handle_pi(self, data):
+        self.out.append(f'<?{data}>')
+
+
+def compile_template_html(html: str) -> dict:
+    """템플릿 저장 시 한 번: CSS 인라인 + HTML 최소화, 텍스트 대체 본문까지 미리 만듦"""
+    html = html or ''
+    # Outlook 조건부 주석 안의 <style>은 그 클라이언트에만 적용되므로 인라인하지 않고 그대로 둠
+    conditional = [m.span() for m in _CONDITIONAL_COMMENT_RE.finditer(html)]
+    blocks = [
+        m for m in _STYLE_BLOCK_RE.finditer(html)
+        if not any(start <= m.start() < end for start, end in conditional)
+    ]
+    rules, keep = _parse_css('\n'.join(m.group(1) for m in blocks))
+    source = html
+    if blocks:
+        pieces = []
+        last = 0
+        for m in blocks:
+            pieces.append(html[last:m.start()])
+            last = m.end()
+        pieces.append(html[last:])
+        source = ''.join(pieces)
+    if keep:
+        # 인라인하지 못한 규칙(@media, :hover 등)은 <head> 끝(없으면 첫 <style> 자리)에 하나로 모아 남김
+        kept = f'<style>{"".join(keep)}</style>'
+        head_end = _HEAD_END_RE.search(source)
+        at = head_end.start() if head_end else blocks[0].start()
+        source = source[:at] + kept + source[at:]
+    compiler = _TemplateCompiler(rules)
+    compiler.feed(source)
+    compiler.close()
+    compiled = ''.join(compiler.out).strip()
+    return {
+        'version': TEMPLATE_COMPILE_VERSION,
+        'source_hash': _body_hash(html),
+        'html': compiled,
+        'text': _html_to_plain_text(compiled),
+    }
 
-def build_email_message(subject: str, from_email: str, recipient: str, html: str, template_id: str, strict_inline: bool = True, inline_images: dict[str, str] | None = None):
+
+def estimate_message_size(template_id: str, template: dict, compiled: dict, from_email: str) -> int:
+    """수신자 한 명에게 실제로 나가는 메시지 크기(바이트, 인라인 이미지 포함)"""
+    inline_images, _ = _resolve_inline_images(template_id, compiled['html'])
+    msg = build_email_message(
+        subject=template.get('subject') or '',
+        from_email=from_email,
+        recipient='recipient@example.com',
+        html=compiled['html'],
+        template_id=template_id,
+        strict_inline=False,
+        inline_images=inline_images,
+        text=compiled['text'],
+    )
+    return len(_flatten_message(msg))
+
+
+def compiled_template(template: dict) -> dict:
+    """저장된 컴파일 결과. 이전 버전에서 저장한 템플릿이나 원본이 바뀐 경우에는 바로 컴파일"""
+    compiled = template.get('compiled') or {}
+    if compiled.get('version') == TEMPLATE_COMPILE_VERSION and compiled.get('source_hash') == _body_hash(template.get('html_content') or ''):
+        return compiled
+    return compile_template_html(template.get('html_content') or '')
+
+
+def _stored_plain_text(template_id: str, html: str) -> str | None:
+    """템플릿 저장 시 만든 텍스트 대체 본문. run 본문이 지금 템플릿의 컴파일 결과와 다르면(이후 수정됨) None"""
+    template = load_template(template_id) if template_id else None
+    if not template:
+        return None
+    compiled = compiled_template(template)
+    return compiled['text'] if compiled['html'] == html else None
+
+
+def build_email_message(subject: str, from_email: str, recipient: str, html: str, template_id: str, strict_inline: bool = True, inline_images: dict[str, str] | None = None, text: str | None = None):
     related = MIMEMultipart('related')
     related['Subject'] = subject
     related['From'] = from_email
     related['To'] = recipient
 
     alternative = MIMEMultipart('alternative')
-    alternative.attach(MIMEText(_html_to_plain_text(html), 'plain', 'utf-8'))
+    alternative.attach(MIMEText(_html_to_plain_text(html) if text is None else text, 'plain', 'utf-8'))
     alternative.attach(MIMEText(html or '', 'html', 'utf-8'))
     related.attach(alternative)
 
@@ -172,23 +914,427 @@ def build_email_message(subject: str, from_email: str, recipient: str, html: str
     return related
 
 
-def get_db():
-    conn = sqlite3.connect(DB_FILE)
+def _flatten_message(msg) -> bytes:
+    buf = io.BytesIO()
+    BytesGenerator(buf).flatten(msg, linesep='\r\n')
+    return buf.getvalue()
+
+
+def _split_message(raw: bytes) -> tuple[bytes, bytes]:
+    """평탄화한 메시지를 (헤더 블록(마지막 CRLF 포함), 본문)으로 나눔"""
+    head, _, body = raw.partition(b'\r\n\r\n')
+    return head + b'\r\n', body
+
+
+def _header_line(name: str, value: str) -> bytes:
+    m = Message()
+    m[name] = value
+    return _flatten_message(m)[:-2]
+
+
+def dkim_enabled() -> bool:
+    return bool(DKIM_PRIVATE_KEY)
+
+
+class DKIMKeyError(Exception):
+    """DKIM 키를 쓸 수 없음(파일 없음, 형식 오류 등). 설정 문제라 재시도하지 않고 run 전체에 해당함"""
+
+
+@lru_cache(maxsize=1)
+def _load_dkim_key(path: str):
+    """DKIM 개인키는 프로세스마다 한 번만 읽음 (실패는 캐시되지 않으므로 호출한 쪽이 run마다 한 번만 부름)"""
+    if serialization is None:
+        raise DKIMKeyError('DKIM 서명에는 cryptography 패키지가 필요합니다 (pip install cryptography).')
+    try:
+        with open(path, 'rb') as f:
+            key = serialization.load_pem_private_key(f.read(), password=None)
+    except (OSError, ValueError, TypeError) as e:
+        # OSError를 그대로 올리면 네트워크 장애처럼 일시적 실패로 분류되어 재시도됨
+        raise DKIMKeyError(f'DKIM 키를 읽을 수 없습니다 ({path}): {e}') from e
+    if not isinstance(key, (rsa.RSAPrivateKey, ed25519.Ed25519PrivateKey)):
+        raise DKIMKeyError('DKIM 키는 RSA 또는 Ed25519여야 합니다.')
+    return key
+
+
+_WSP_RE = re.compile(rb'[ \t]+')
+
+
+def _dkim_body_hash(body: bytes) -> bytes:
+    """relaxed 본문 정규화 후 SHA-256 (RFC 6376 3.4.4). 본문 크기에 비례하므로 run마다 한 번만 호출"""
+    lines = [_WSP_RE.sub(b' ', line).rstrip(b' ') for line in body.split(b'\r\n')]
+    while lines and not lines[-1]:
+        lines.pop()
+    canon = b'\r\n'.join(lines) + b'\r\n' if lines else b''
+    return base64.b64encode(hashlib.sha256(canon).digest())
+
+
+def _dkim_canon_header(name: bytes, value: bytes) -> bytes:
+    value = _WSP_RE.sub(b' ', value.replace(b'\r\n', b'')).strip(b' ')
+    return name.strip().lower() + b':' + value + b'\r\n'
+
+
+def dkim_signature(head: bytes, bh: bytes, from_email: str) -> bytes:
+    """헤더 블록에 대한 DKIM-Signature 헤더 줄. 본문 해시(bh=)는 호출한 쪽이 계산한 값을 그대로 씀"""
+    key = _load_dkim_key(DKIM_PRIVATE_KEY)
+    algo = 'ed25519-sha256' if isinstance(key, ed25519.Ed25519PrivateKey) else 'rsa-sha256'
+    headers = {}
+    name = None
+    for line in head.split(b'\r\n'):
+        if line[:1] in (b' ', b'\t') and name is not None:
+            headers[name] = (headers[name][0], headers[name][1] + b'\r\n' + line)
+        elif line:
+            raw_name, _, value = line.partition(b':')
+            name = raw_name.strip().lower().decode('ascii', 'replace')
+            headers[name] = (raw_name, value)
+    signed = [h for h in DKIM_SIGNED_HEADERS if h in headers]
+
+    domain = DKIM_DOMAIN or _recipient_domain(from_email)
+    tags = f'v=1; a={algo}; c=relaxed/relaxed; d={domain}; s={DKIM_SELECTOR}; t={int(time.time())}; h={":".join(signed)}; bh={bh.decode()}; b='
+    data = b''.join(_dkim_canon_header(*headers[h]) for h in signed)
+    data += _dkim_canon_header(b'DKIM-Signature', tags.encode())[:-2]
+    if algo == 'rsa-sha256':
+        sig = key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+    else:
+        sig = key.sign(hashlib.sha256(data).digest())
+    return f'DKIM-Signature: {tags}{base64.b64encode(sig).decode()}\r\n'.encode()
+
+
+def dkim_sign_message(raw: bytes, from_email: str) -> bytes:
+    """평탄화한 메시지 하나에 서명 (테스트 메일 등 본문을 한 번만 보내는 경우)"""
+    if not dkim_enabled():
+        return raw
+    head, body = _split_message(raw)
+    return dkim_signature(head, _dkim_body_hash(body), from_email) + head + b'\r\n' + body
+
+
+_run_payload_cache: dict[tuple, tuple[bytes, bytes, bytes | None]] = {}
+_run_payload_lock = threading.Lock()
+
+
+def _run_payload(run_id: str, subject: str, from_email: str, html: str, template_id: str, inline_images: dict[str, str]) -> tuple[bytes, bytes, bytes | None]:
+    """run의 메시지에서 수신자와 무관한 부분을 한 번만 만듦: (To를 뺀 헤더 블록, 본문, DKIM 본문 해시).
+
+    MIME 경계 문자열을 run id로 고정해 청크/워커가 달라도 본문 바이트가 같으므로 bh=도 run마다 한 번만 계산.
+    DKIM 키도 여기서 먼저 읽어, 키가 잘못됐으면 수신자마다가 아니라 한 번 DKIMKeyError로 드러남
+    """
+    if dkim_enabled():
+        _load_dkim_key(DKIM_PRIVATE_KEY)
+    stamp = []
+    for cid, path in sorted(inline_images.items()):
+        st = os.stat(path)
+        stamp.append((cid, path, st.st_mtime_ns, st.st_size))
+    key = (run_id, tuple(stamp))
+    with _run_payload_lock:
+        cached = _run_payload_cache.get(key)
+    if cached is not None:
+        return cached
+
+    msg = build_email_message(
+        subject=subject,
+        from_email=from_email,
+        recipient='',
+        html=html,
+        template_id=template_id,
+        strict_inline=True,
+        inline_images=inline_images,
+        text=_stored_plain_text(template_id, html),
+    )
+    del msg['To']
+    token = hashlib.sha256(run_id.encode('utf-8')).hexdigest()[:24]
+    msg.set_boundary(f'=_{token}_r')
+    msg.get_payload(0).set_boundary(f'=_{token}_a')
+    head, body = _split_message(_flatten_message(msg))
+    out = (head, body, _dkim_body_hash(body) if dkim_enabled() else None)
+
+    with _run_payload_lock:
+        _run_payload_cache[key] = out
+        while len(_run_payload_cache) > RUN_PAYLOAD_CACHE_MAX:
+            _run_payload_cache.pop(next(iter(_run_payload_cache)))
+    return out
+
+
+def _compose_message(head: bytes, body: bytes, bh: bytes | None, from_email: str, recipient: str) -> bytes:
+    """미리 만든 헤더 블록/본문에 To 헤더(와 DKIM 서명)만 붙여 보낼 바이트를 만듦"""
+    head = head + _header_line('To', recipient)
+    if bh is not None:
+        head = dkim_signature(head, bh, from_email) + head
+    return head + b'\r\n' + body
+
+
+def _recipient_domain(recipient: str) -> str:
+    _, addr = parseaddr(recipient)
+    addr = addr or recipient
+    return addr.rsplit('@', 1)[-1].lower() if '@' in addr else ''
+
+
+def _group_recipients_by_domain(recipients: list[str], batch_size: int) -> list[list[str]]:
+    """도메인별로 묶은 뒤 트랜잭션당 최대 batch_size 명씩 나눔 (도메인 첫 등장 순서 유지)"""
+    groups: dict[str, list[str]] = {}
+    for r in recipients:
+        groups.setdefault(_recipient_domain(r), []).append(r)
+    batches = []
+    for rcpts in groups.values():
+        for i in range(0, len(rcpts), batch_size):
+            batches.append(rcpts[i:i + batch_size])
+    return batches
+
+
+class SendResult(NamedTuple):
+    """수신자 한 명의 발송 결과. 실패면 code(SMTP 응답 코드)와 exc(원인 예외)로 재시도 여부를 가림"""
+    recipient: str
+    status: str
+    error: str | None = None
+    sent_at: str | None = None
+    code: int | None = None
+    exc: Exception | None = None
+
+    @classmethod
+    def failure(cls, recipient: str, exc: Exception) -> 'SendResult':
+        # 세션 열기 실패는 원인 예외(연결 끊김/로그인 거부)로 재시도 여부를 가림
+        cause = exc.__cause__ if isinstance(exc, SMTPSessionError) and exc.__cause__ else exc
+        return cls(recipient, 'failed', str(exc), None, _smtp_error_code(cause), cause)
+
+
+def _send_multi_rcpt(server: smtplib.SMTP, from_email: str, batch: list[str], payload: bytes) -> list[SendResult]:
+    """한 번의 MAIL/DATA 트랜잭션에 여러 RCPT TO를 실어 보내고, 수신자별 결과를 돌려줌"""
+    envelope_from = parseaddr(from_email)[1] or from_email
+    try:
+        refused = server.sendmail(envelope_from, batch, payload)
+    except smtplib.SMTPRecipientsRefused as e:
+        refused = e.recipients
+    except Exception as e:
+        return [SendResult.failure(r, e) for r in batch]
+
+    now = _now_iso()
+    out = []
+    for r in batch:
+        if r in refused:
+            code, resp = refused[r]
+            if isinstance(resp, bytes):
+                resp = resp.decode('utf-8', 'replace')
+            out.append(SendResult(r, 'failed', f'{code} {resp}', code=code))
+        else:
+            out.append(SendResult(r, 'sent', sent_at=now))
+    return out
+
+
+class _ReusableConnection(sqlite3.Connection):
+    """상주 워커용 연결: close()는 열린 트랜잭션만 정리하고 연결은 스레드에 남겨 재사용"""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+
+# 상주 워커 모드에서만 켜짐: 스레드별로 SQLite 연결 하나를 계속 사용
+DB_REUSE_CONNECTIONS = False
+_db_local = threading.local()
+
+
+def _connect_db(factory=sqlite3.Connection) -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_FILE, factory=factory)
     conn.row_factory = sqlite3.Row
+    # 새 DB는 보관 후 지운 공간을 incremental_vacuum으로 돌려받을 수 있게 생성 (첫 페이지가 쓰이기 전에만 적용됨, 기존 DB는 archive-runs --vacuum)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
     conn.execute('PRAGMA journal_mode = WAL')
     conn.execute('PRAGMA busy_timeout = 3000')
     conn.execute('PRAGMA foreign_keys = ON')
     return conn
 
 
+def get_db():
+    if not DB_REUSE_CONNECTIONS:
+        return _connect_db()
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = _connect_db(_ReusableConnection)
+        _db_local.conn = conn
+    return conn
+
+
+class _WriteIntent:
+    __slots__ = ('fn', 'done', 'result', 'error')
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_write_queue: queue.Queue = queue.Queue()
+_writer_thread: threading.Thread | None = None
+_writer_start_lock = threading.Lock()
+
+
+def _reset_writer_after_fork():
+    # 포크된 자식(RQ 기본 워커의 작업 프로세스)에는 writer 스레드가 없으므로 새로 시작
+    global _write_queue, _writer_thread, _writer_start_lock
+    _write_queue = queue.Queue()
+    _writer_thread = None
+    _writer_start_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_writer_after_fork)
+
+
+def _open_host_write_lock():
+    return open(DB_FILE + '.writelock', 'a+') if fcntl is not None else None
+
+
+@contextmanager
+def _host_write_lock(lock_file):
+    """같은 호스트의 writer들이 DB 쓰기 트랜잭션을 한 번에 하나씩 열도록 파일 잠금으로 줄 세움"""
+    if lock_file is None:
+        yield
+        return
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _apply_write_batch(conn: sqlite3.Connection, lock_file, batch: list[_WriteIntent]):
+    """쌓인 쓰기 의도를 한 트랜잭션으로 반영. 실패한 의도는 savepoint로 그것만 되돌림"""
+    try:
+        with _host_write_lock(lock_file):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for intent in batch:
+                    conn.execute('SAVEPOINT write_intent')
+                    try:
+                        intent.result = intent.fn(conn)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write_intent')
+                        intent.error = e
+                    conn.execute('RELEASE write_intent')
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+    except Exception as e:
+        for intent in batch:
+            if intent.error is None:
+                intent.result = None
+                intent.error = e
+    finally:
+        for intent in batch:
+            intent.done.set()
+
+
+def _fail_queued_writes(q: queue.Queue, error: Exception):
+    while True:
+        try:
+            intent = q.get_nowait()
+        except queue.Empty:
+            return
+        intent.error = error
+        intent.done.set()
+
+
+def _writer_loop(q: queue.Queue):
+    try:
+        conn = _connect_db()
+        conn.isolation_level = None
+        lock_file = _open_host_write_lock()
+    except Exception as e:
+        # 기다리는 호출에 오류를 돌려주고 끝냄. 다음 db_write가 writer를 다시 시작
+        app.logger.exception('DB writer 시작 실패')
+        _fail_queued_writes(q, e)
+        return
+    while True:
+        # 트랜잭션을 반영하는 동안 쌓인 의도를 한꺼번에 가져가 다음 트랜잭션으로 묶음
+        batch = [q.get()]
+        while len(batch) < DB_WRITE_BATCH_MAX:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+        _apply_write_batch(conn, lock_file, batch)
+
+
+def _ensure_writer() -> queue.Queue:
+    """writer 스레드가 없거나 죽었으면 새로 시작 (큐에 남은 쓰기는 새 스레드가 이어서 처리)"""
+    global _writer_thread
+    q = _write_queue
+    if _writer_thread is None or not _writer_thread.is_alive():
+        with _writer_start_lock:
+            if _writer_thread is None or not _writer_thread.is_alive():
+                _writer_thread = threading.Thread(target=_writer_loop, args=(q,), name='db-writer', daemon=True)
+                _writer_thread.start()
+    return q
+
+
+def db_write(fn):
+    """fn(conn)을 쓰기 트랜잭션 안에서 실행하고 반환값을 돌려줌 (fn은 commit하지 않음)"""
+    if DB_WRITE_JOURNAL and threading.current_thread() is _writer_thread:
+        # writer가 트랜잭션을 연 채로 자기 큐를 기다리거나 다른 연결로 쓰면 멈추므로 바로 오류
+        raise RuntimeError('db_write 안에서 db_write를 호출할 수 없습니다. fn이 받은 conn을 사용하세요.')
+    if not DB_WRITE_JOURNAL:
+        conn = get_db()
+        try:
+            result = fn(conn)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    intent = _WriteIntent(fn)
+    _ensure_writer().put(intent)
+    deadline = time.monotonic() + DB_WRITE_TIMEOUT
+    while not intent.done.wait(1.0):
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f'DB 쓰기가 {DB_WRITE_TIMEOUT:.0f}초 안에 끝나지 않았습니다 (writer 스레드 응답 없음)')
+        _ensure_writer()
+    if intent.error is not None:
+        raise intent.error
+    return intent.result
+
+
+def db_execute(sql: str, params=()) -> int:
+    """UPDATE/INSERT 한 문장을 writer를 거쳐 실행하고 rowcount를 돌려줌"""
+    return db_write(lambda conn: conn.execute(sql, params).rowcount)
+
+
+def db_executemany(sql: str, rows) -> int:
+    return db_write(lambda conn: conn.executemany(sql, rows).rowcount)
+
+
+def _ensure_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]):
+    existing = {r['name'] for r in conn.execute(f"PRAGMA table_info({table})")}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
 def _get_redis_url() -> str:
     return os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
 
-def get_queue() -> Queue:
-    qname = os.environ.get('RQ_QUEUE', 'webmailsender')
-    conn = Redis.from_url(_get_redis_url())
-    return Queue(qname, connection=conn)
+def _queue_name(priority: str = 'bulk') -> str:
+    """bulk는 기존 RQ_QUEUE 이름을 그대로 쓰고, 상위 우선순위는 접미사를 붙임"""
+    base = os.environ.get('RQ_QUEUE', 'webmailsender')
+    return base if priority == 'bulk' else f'{base}-{priority}'
+
+
+_redis_conn: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """프로세스 전체에서 공유하는 Redis 클라이언트 (내부 커넥션 풀 재사용)"""
+    global _redis_conn
+    if _redis_conn is None:
+        _redis_conn = Redis.from_url(_get_redis_url())
+    return _redis_conn
+
+
+def get_queue(priority: str = 'bulk') -> Queue:
+    return Queue(_queue_name(priority), connection=get_redis())
 
 
 def init_db():
@@ -208,90 +1354,375 @@ def init_db():
             status TEXT NOT NULL,
             total_count INTEGER NOT NULL DEFAULT 0,
             success_count INTEGER NOT NULL DEFAULT 0,
-            fail_count INTEGER NOT NULL DEFAULT 0
+            fail_count INTEGER NOT NULL DEFAULT 0,
+            rcpt_batch_size INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at TEXT,
+            scheduled_at TEXT,
+            window_end TEXT,
+            daily_start TEXT,
+            daily_end TEXT,
+            next_release_at TEXT,
+            priority TEXT NOT NULL DEFAULT 'bulk',
+            weight INTEGER NOT NULL DEFAULT 1,
+            chunk_job_id TEXT,
+            body_hash TEXT,
+            seq INTEGER,
+            archived_at TEXT,
+            dry_run INTEGER NOT NULL DEFAULT 0,
+            dry_run_stats TEXT
         );
 
-        CREATE TABLE IF NOT EXISTS send_recipients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_id TEXT NOT NULL,
-            recipient_email TEXT NOT NULL,
-            status TEXT NOT NULL,
+        -- run 본문 스냅샷은 내용 해시로 한 번만 저장 (send_runs.html_content는 이전 버전 호환용으로 비워 둠)
+        CREATE TABLE IF NOT EXISTS run_bodies (
+            hash TEXT PRIMARY KEY,
+            html_content TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+
+        -- 수신자 주소는 도메인/로컬 파트로 나눠 한 번만 저장 (domain_id 0 = '@' 없는 주소)
+        CREATE TABLE IF NOT EXISTS email_domains (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS email_addresses (
+            id INTEGER PRIMARY KEY,
+            domain_id INTEGER NOT NULL,
+            local_part TEXT NOT NULL,
+            UNIQUE(domain_id, local_part)
+        );
+
+        -- run별 수신자 상태. status는 정수 코드(RCPT_*), 시각은 epoch 초
+        CREATE TABLE IF NOT EXISTS run_recipients (
+            run_seq INTEGER NOT NULL,
+            address_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            status INTEGER NOT NULL,
             attempt_count INTEGER NOT NULL DEFAULT 0,
             last_error TEXT,
-            sent_at TEXT,
-            updated_at TEXT NOT NULL,
-            FOREIGN KEY(run_id) REFERENCES send_runs(id) ON DELETE CASCADE,
-            UNIQUE(run_id, recipient_email)
+            sent_at INTEGER,
+            updated_at INTEGER NOT NULL,
+            next_attempt_at INTEGER,
+            PRIMARY KEY (run_seq, address_id)
+        ) WITHOUT ROWID;
+
+        -- 일회성 작업 완료 표시 등 앱 상태 값
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
         );
 
         CREATE INDEX IF NOT EXISTS idx_send_runs_created_at ON send_runs(created_at);
-        CREATE INDEX IF NOT EXISTS idx_send_recipients_run_status ON send_recipients(run_id, status);
+        CREATE INDEX IF NOT EXISTS idx_run_recipients_status ON run_recipients(run_seq, status, position);
+        CREATE INDEX IF NOT EXISTS idx_run_recipients_next_attempt
+            ON run_recipients(next_attempt_at)
+         WHERE next_attempt_at IS NOT NULL;
         """
     )
+    # 이전 버전 DB 마이그레이션
+    _ensure_columns(conn, 'send_runs', {
+        'rcpt_batch_size': 'INTEGER NOT NULL DEFAULT 0',
+        'lease_owner': 'TEXT',
+        'lease_expires_at': 'TEXT',
+        'scheduled_at': 'TEXT',
+        'window_end': 'TEXT',
+        'daily_start': 'TEXT',
+        'daily_end': 'TEXT',
+        'next_release_at': 'TEXT',
+        'priority': "TEXT NOT NULL DEFAULT 'bulk'",
+        'weight': 'INTEGER NOT NULL DEFAULT 1',
+        'chunk_job_id': 'TEXT',
+        'body_hash': 'TEXT',
+        'seq': 'INTEGER',
+        'archived_at': 'TEXT',
+        'dry_run': 'INTEGER NOT NULL DEFAULT 0',
+        'dry_run_stats': 'TEXT',
+    })
+    # 수신자 행이 참조하는 run 번호 (uuid 대신 정수로 저장해 행 크기를 줄임)
+    conn.execute(
+        "UPDATE send_runs SET seq = (SELECT COALESCE(MAX(seq), 0) FROM send_runs) + rowid WHERE seq IS NULL"
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_send_runs_seq ON send_runs(seq)")
     conn.commit()
+    _migrate_run_bodies(conn)
+    _migrate_send_recipients(conn)
     conn.close()
 
 
-def reset_run_for_execution(run_id: str, status: str = 'queued'):
+def get_meta(key: str) -> str | None:
     conn = get_db()
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    conn.close()
+    return row['value'] if row else None
+
+
+def set_meta(key: str, value: str):
+    db_execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _split_address(email: str) -> tuple[str, str | None]:
+    local, sep, domain = email.rpartition('@')
+    return (local, domain) if sep else (email, None)
+
+
+def _intern_addresses(conn: sqlite3.Connection, emails, create: bool = True, cache: dict | None = None) -> dict[str, int]:
+    """주소 -> email_addresses.id. create=False면 없는 주소는 결과에서 빠짐 (쓰기 트랜잭션 안에서 호출)"""
+    cache = {} if cache is None else cache
+    out = {}
+    for email in emails:
+        address_id = cache.get(email)
+        if address_id is None:
+            local, domain = _split_address(email)
+            domain_id = 0
+            if domain is not None:
+                domain_id = cache.get(('domain', domain))
+                if domain_id is None:
+                    row = conn.execute("SELECT id FROM email_domains WHERE name = ?", (domain,)).fetchone()
+                    if row:
+                        domain_id = row[0]
+                    elif create:
+                        domain_id = conn.execute("INSERT INTO email_domains (name) VALUES (?)", (domain,)).lastrowid
+                    else:
+                        continue
+                    cache[('domain', domain)] = domain_id
+            row = conn.execute(
+                "SELECT id FROM email_addresses WHERE domain_id = ? AND local_part = ?",
+                (domain_id, local),
+            ).fetchone()
+            if row:
+                address_id = row[0]
+            elif create:
+                address_id = conn.execute(
+                    "INSERT INTO email_addresses (domain_id, local_part) VALUES (?, ?)",
+                    (domain_id, local),
+                ).lastrowid
+            else:
+                continue
+            cache[email] = address_id
+        out[email] = address_id
+    return out
+
+
+def _to_epoch(value: str | None) -> int | None:
+    return int(datetime.fromisoformat(value).timestamp()) if value else None
+
+
+def _from_epoch(value: int | None) -> str | None:
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+# run_recipients r 에서 주소 문자열을 복원하기 위한 조인/식
+_RCPT_JOIN_SQL = """
+    JOIN email_addresses a ON a.id = r.address_id
+    LEFT JOIN email_domains d ON d.id = a.domain_id
+"""
+_RCPT_EMAIL_SQL = "CASE WHEN a.domain_id = 0 THEN a.local_part ELSE a.local_part || '@' || d.name END"
+_RUN_SEQ_SQL = "(SELECT seq FROM send_runs WHERE id = ?)"
+_RCPT_STATUS_NAME_SQL = f"CASE r.status WHEN {RCPT_PENDING} THEN 'pending' WHEN {RCPT_SENT} THEN 'sent' ELSE 'failed' END"
+
+
+# 발송 청크에서 읽은 주소 id를 기억해 상태 갱신 때 다시 찾지 않음 (주소 행은 지우지 않으므로 id가 바뀌지 않음)
+_address_id_cache: dict[str, int] = {}
+ADDRESS_ID_CACHE_MAX = 100000
+
+
+def _remember_address_ids(rows):
+    if len(_address_id_cache) > ADDRESS_ID_CACHE_MAX:
+        _address_id_cache.clear()
+    for r in rows:
+        _address_id_cache[r['recipient_email']] = r['address_id']
+
+
+def _migrate_send_recipients(conn: sqlite3.Connection, batch_size: int = 50000):
+    """이전 send_recipients(주소/상태 문자열, ISO 시각) 행을 run_recipients로 옮긴 뒤 테이블을 삭제"""
+    def has_old_table():
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'send_recipients'"
+        ).fetchone() is not None
+
+    if not has_old_table():
+        return
+    # 웹/워커가 동시에 시작해도 한 프로세스만 옮기도록 호스트 쓰기 잠금 안에서 진행
+    lock_file = _open_host_write_lock()
+    try:
+        with _host_write_lock(lock_file):
+            if not has_old_table():
+                return
+            _ensure_columns(conn, 'send_recipients', {'next_attempt_at': 'TEXT'})
+            cache: dict = {}
+            last_id = 0
+            while True:
+                conn.execute('BEGIN IMMEDIATE')
+                rows = conn.execute(
+                    """
+                    SELECT r.id, s.seq, r.recipient_email, r.status, r.attempt_count,
+                           r.last_error, r.sent_at, r.updated_at, r.next_attempt_at
+                      FROM send_recipients r
+                      JOIN send_runs s ON s.id = r.run_id
+                     WHERE r.id > ?
+                     ORDER BY r.id
+                     LIMIT ?
+                    """,
+                    (last_id, batch_size),
+                ).fetchall()
+                if not rows:
+                    conn.execute("DROP TABLE send_recipients")
+                    conn.commit()
+                    break
+                ids = _intern_addresses(conn, {r['recipient_email'] for r in rows}, cache=cache)
+                conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO run_recipients (
+                        run_seq, address_id, position, status, attempt_count,
+                        last_error, sent_at, updated_at, next_attempt_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            r['seq'],
+                            ids[r['recipient_email']],
+                            r['id'],
+                            RCPT_STATUS_CODES.get(r['status'], RCPT_FAILED),
+                            r['attempt_count'] or 0,
+                            r['last_error'],
+                            _to_epoch(r['sent_at']),
+                            _to_epoch(r['updated_at']) or 0,
+                            _to_epoch(r['next_attempt_at']),
+                        )
+                        for r in rows
+                    ],
+                )
+                conn.commit()
+                last_id = rows[-1]['id']
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+
+
+def _body_hash(html: str) -> str:
+    return hashlib.sha256((html or '').encode('utf-8')).hexdigest()
+
+
+def _store_run_body(conn: sqlite3.Connection, html: str) -> str:
+    body_hash = _body_hash(html)
     conn.execute(
+        "INSERT OR IGNORE INTO run_bodies (hash, html_content, created_at) VALUES (?, ?, ?)",
+        (body_hash, html or '', _now_iso()),
+    )
+    return body_hash
+
+
+def _migrate_run_bodies(conn: sqlite3.Connection, batch_size: int = 100):
+    """send_runs에 본문을 그대로 들고 있는 이전 행을 run_bodies로 옮기고 html_content를 비움"""
+    while True:
+        rows = conn.execute(
+            "SELECT id, html_content FROM send_runs WHERE body_hash IS NULL LIMIT ?",
+            (batch_size,),
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            body_hash = _store_run_body(conn, row['html_content'])
+            conn.execute(
+                "UPDATE send_runs SET body_hash = ?, html_content = '' WHERE id = ?",
+                (body_hash, row['id']),
+            )
+        conn.commit()
+
+
+@lru_cache(maxsize=32)
+def load_run_body(body_hash: str) -> str | None:
+    """해시로 본문 조회. 내용이 바뀌지 않으므로 프로세스 안에서 캐시해 청크마다 다시 읽지 않음"""
+    conn = get_db()
+    row = conn.execute("SELECT html_content FROM run_bodies WHERE hash = ?", (body_hash,)).fetchone()
+    conn.close()
+    return row['html_content'] if row else None
+
+
+def _with_run_body(run: dict) -> dict:
+    body_hash = run.pop('body_hash', None)
+    if body_hash:
+        body = load_run_body(body_hash)
+        if body is not None:
+            run['html_content'] = body
+    return run
+
+
+def reset_run_for_execution(run_id: str, status: str = 'queued') -> bool:
+    """자동 재시도가 lease를 잡고 있으면 바꾸지 않고 False를 돌려줌"""
+    updated = db_execute(
         """
         UPDATE send_runs
            SET status = ?,
                started_at = NULL,
                finished_at = NULL
          WHERE id = ?
+           AND (lease_owner IS NULL OR lease_expires_at < ?)
         """,
-        (status, run_id),
+        (status, run_id, _now_iso()),
     )
-    conn.commit()
-    conn.close()
+    return updated == 1
 
 
-def mark_all_recipients_failed(run_id: str, error: str):
-    now = _now_iso()
-    conn = get_db()
-    conn.execute(
-        """
-        UPDATE send_recipients
-           SET status = 'failed',
+def mark_all_recipients_failed(run_id: str, error: str, next_attempt_at: str | None = None):
+    now = int(time.time())
+    db_execute(
+        f"""
+        UPDATE run_recipients
+           SET status = {RCPT_FAILED},
                attempt_count = attempt_count + 1,
                last_error = ?,
-               updated_at = ?
-         WHERE run_id = ? AND status IN ('pending', 'failed')
+               updated_at = ?,
+               next_attempt_at = CASE WHEN attempt_count + 1 < ? THEN ? END
+         WHERE run_seq = {_RUN_SEQ_SQL} AND status IN ({RCPT_PENDING}, {RCPT_FAILED})
         """,
-        (error, now, run_id),
+        (error, now, RETRY_MAX_ATTEMPTS, _to_epoch(next_attempt_at), run_id),
     )
-    conn.commit()
-    conn.close()
 
 
-def create_send_run(template_id: str, template: dict, from_email: str, recipients: list[str]) -> str:
+def create_send_run(template_id: str, template: dict, from_email: str, recipients: list[str], rcpt_batch_size: int = 0, pacing: dict | None = None, priority: str = 'bulk', weight: int = 1, dry_run: bool = False) -> str:
     run_id = str(uuid.uuid4())
     now = _now_iso()
-    conn = get_db()
-    conn.execute(
-        """
-        INSERT INTO send_runs (
-            id, template_id, template_title, subject, from_email, html_content,
-            created_at, started_at, status, total_count
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            run_id,
-            template_id,
-            template.get('title') or template_id,
-            template.get('subject') or '',
-            from_email,
-            template.get('html_content') or '',
-            now,
-            None,
-            'queued',
-            len(recipients),
-        ),
-    )
-    conn.commit()
-    conn.close()
+    pacing = pacing or {}
+
+    def insert(conn):
+        body_hash = _store_run_body(conn, template.get('html_content') or '')
+        conn.execute(
+            """
+            INSERT INTO send_runs (
+                id, template_id, template_title, subject, from_email, html_content,
+                created_at, started_at, status, total_count, rcpt_batch_size,
+                scheduled_at, window_end, daily_start, daily_end, priority, weight, body_hash, dry_run, seq
+            ) VALUES (
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                (SELECT COALESCE(MAX(seq), 0) + 1 FROM send_runs)
+            )
+            """,
+            (
+                run_id,
+                template_id,
+                template.get('title') or template_id,
+                template.get('subject') or '',
+                from_email,
+                '',
+                now,
+                None,
+                'queued',
+                len(recipients),
+                rcpt_batch_size,
+                pacing.get('scheduled_at'),
+                pacing.get('window_end'),
+                pacing.get('daily_start'),
+                pacing.get('daily_end'),
+                priority,
+                weight,
+                body_hash,
+                1 if dry_run else 0,
+            ),
+        )
+
+    db_write(insert)
     return run_id
 
 
@@ -305,8 +1736,7 @@ def get_run_status(run_id: str) -> str | None:
 
 
 def set_run_status(run_id: str, status: str, started_at: str | None = None, finished_at: str | None = None):
-    conn = get_db()
-    conn.execute(
+    db_execute(
         """
         UPDATE send_runs
            SET status = ?,
@@ -316,15 +1746,14 @@ def set_run_status(run_id: str, status: str, started_at: str | None = None, fini
         """,
         (status, started_at, finished_at, run_id),
     )
-    conn.commit()
-    conn.close()
 
 
 def fetch_run_status_summary(run_id: str) -> dict | None:
     conn = get_db()
     run = conn.execute(
         """
-        SELECT id, template_title AS title, created_at, started_at, finished_at, status
+        SELECT id, template_title AS title, created_at, started_at, finished_at, status,
+               archived_at, total_count, success_count, fail_count
           FROM send_runs
          WHERE id = ?
         """,
@@ -334,187 +1763,964 @@ def fetch_run_status_summary(run_id: str) -> dict | None:
         conn.close()
         return None
 
+    out = dict(run)
+    out['sent_at'] = out.get('finished_at') or out.get('started_at') or out.get('created_at')
+    if run['archived_at']:
+        # 보관된 run은 수신자 행이 지워졌으므로 send_runs에 남긴 카운트를 씀
+        conn.close()
+        out['total_count'] = int(run['total_count'] or 0)
+        out['success_count'] = int(run['success_count'] or 0)
+        out['fail_count'] = int(run['fail_count'] or 0)
+        out['pending_count'] = max(out['total_count'] - out['success_count'] - out['fail_count'], 0)
+        return out
+
     cur = conn.execute(
-        """
+        f"""
         SELECT
-          SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) AS success_count,
-          SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS fail_count,
-          SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) AS pending_count,
+          SUM(CASE WHEN status = {RCPT_SENT} THEN 1 ELSE 0 END) AS success_count,
+          SUM(CASE WHEN status = {RCPT_FAILED} THEN 1 ELSE 0 END) AS fail_count,
+          SUM(CASE WHEN status = {RCPT_PENDING} THEN 1 ELSE 0 END) AS pending_count,
           COUNT(*) AS total_count
-        FROM send_recipients
-        WHERE run_id = ?
+        FROM run_recipients
+        WHERE run_seq = {_RUN_SEQ_SQL}
         """,
         (run_id,),
     )
     counts = cur.fetchone() or {}
     conn.close()
 
-    out = dict(run)
     out['success_count'] = int(counts['success_count'] or 0)
     out['fail_count'] = int(counts['fail_count'] or 0)
     out['pending_count'] = int(counts['pending_count'] or 0)
     out['total_count'] = int(counts['total_count'] or 0)
-    out['sent_at'] = out.get('finished_at') or out.get('started_at') or out.get('created_at')
     return out
 
 
-def background_send_run(run_id: str, retry_only: bool = False):
-    detail = fetch_run_detail(run_id)
-    if not detail:
-        return
+def _open_smtp(config: dict) -> smtplib.SMTP:
+    server = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=SMTP_TIMEOUT)
+    if config.get('smtp_user') and config.get('smtp_password'):
+        server.starttls()
+        server.login(config['smtp_user'], config['smtp_password'])
+    return server
 
-    template_id = detail.get('template_id') or ''
-    html = detail.get('html_content') or ''
-    from_email = detail.get('from_email') or ''
-    subject = detail.get('subject') or ''
 
-    inline_images, missing = _resolve_inline_images(template_id, html)
-    if missing:
-        err = '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)
-        mark_all_recipients_failed(run_id, err)
-        refresh_run_counts(run_id)
-        set_run_status(run_id, 'failed', finished_at=_now_iso())
-        return
+_smtp_pool: dict[tuple, list[tuple[smtplib.SMTP, float]]] = {}
+_smtp_pool_lock = threading.Lock()
 
-    status = get_run_status(run_id)
-    if status in ('cancel_requested', 'canceled'):
-        set_run_status(run_id, 'canceled', finished_at=_now_iso())
-        return
+# 상주 워커(`flask --app app worker`)에서만 켜짐. 작업마다 포크하는 `rq worker`에서는 풀이 작업 프로세스와 함께
+# 버려져 재사용되지 않으므로 세션을 풀에 두지 않고 작업이 끝날 때 QUIT으로 닫음
+SMTP_POOL_ENABLED = False
 
-    set_run_status(run_id, 'running', started_at=_now_iso())
 
-    config = load_config()
+def _smtp_pool_key(config: dict) -> tuple:
+    return (
+        config.get('smtp_server') or '',
+        int(config.get('smtp_port') or 0),
+        config.get('smtp_user') or '',
+        config.get('smtp_password') or '',
+    )
 
-    targets = []
-    for row in detail.get('recipient_rows', []):
-        st = row.get('status')
-        if retry_only:
-            if st in ('pending', 'failed'):
-                targets.append(row['recipient_email'])
-        else:
-            targets.append(row['recipient_email'])
 
-    if not targets:
-        refresh_run_counts(run_id)
-        set_run_status(run_id, 'finished', finished_at=_now_iso())
-        return
+def _close_smtp(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+def _acquire_smtp(config: dict) -> smtplib.SMTP:
+    """풀에 쉬고 있는 세션이 있으면 재사용(오래 쉰 세션은 NOOP으로 확인), 없으면 새로 연결"""
+    key = _smtp_pool_key(config)
+    while True:
+        with _smtp_pool_lock:
+            idle = _smtp_pool.get(key)
+            entry = idle.pop() if idle else None
+        if entry is None:
+            return _open_smtp(config)
+
+        server, released_at = entry
+        idle_for = time.monotonic() - released_at
+        if idle_for > SMTP_POOL_MAX_IDLE:
+            _close_smtp(server)
+            continue
+        if idle_for > SMTP_POOL_CHECK_AFTER:
+            try:
+                if server.noop()[0] != 250:
+                    raise smtplib.SMTPException('NOOP failed')
+            except Exception:
+                _close_smtp(server)
+                continue
+        return server
+
+
+def _release_smtp(config: dict, server: smtplib.SMTP, reusable: bool = True):
+    # 연결이 끊긴 세션(smtplib이 sock을 None으로 만듦)은 풀에 돌려놓지 않음
+    if reusable and SMTP_POOL_ENABLED and server.sock is not None:
+        with _smtp_pool_lock:
+            idle = _smtp_pool.setdefault(_smtp_pool_key(config), [])
+            if len(idle) < SMTP_POOL_SIZE:
+                idle.append((server, time.monotonic()))
+                return
+    _close_smtp(server)
+
+
+class SMTPSessionError(Exception):
+    """SMTP 연결/로그인 실패. 수신자 문제가 아니라 설정/릴레이 문제라 run 전체에 해당함"""
+
+    @property
+    def permanent(self) -> bool:
+        """원인이 5xx(535 인증 실패 등)면 영구, 연결 거부/끊김이나 4xx(421 등)면 일시적"""
+        cause = self.__cause__
+        if cause is None:
+            return True
+        return not _is_transient_failure(_smtp_error_code(cause), cause)
 
+
+@contextmanager
+def smtp_session(config: dict):
     try:
-        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-        if config.get('smtp_user') and config.get('smtp_password'):
-            server.starttls()
-            server.login(config['smtp_user'], config['smtp_password'])
+        server = _acquire_smtp(config)
+    except Exception as e:
+        raise SMTPSessionError(f'SMTP 연결/로그인 실패: {e}') from e
+    reusable = False
+    try:
+        yield server
+        reusable = True
+    finally:
+        _release_smtp(config, server, reusable)
+
+
+# 발송 단계 이벤트. 핸들러는 handler(run_id, **info)로 호출되고, 단계가 끝난 뒤 부르는 이벤트에는
+# info['seconds'](그 단계에 걸린 시간)가 들어감. 등록된 핸들러가 없으면 emit은 바로 반환
+PIPELINE_EVENTS = (
+    'run_start',        # 청크 실행 시작 (lease 획득 직후), 자동 재시도 묶음도 run마다 한 번
+    'targets_fetched',  # 이번 청크 수신자 조회: count
+    'message_start',    # 메시지(묶음 발송은 트랜잭션) 하나 처리 시작: recipients
+    'message_built',    # 메시지 바이트 생성(To 헤더, DKIM 서명): bytes
+    'smtp_sent',        # SMTP 트랜잭션 완료: recipients, ok
+    'status_written',   # 수신자 상태 기록: count
+    'run_finish',       # 청크 실행 종료: outcome, final(run 완료 여부)
+)
+_pipeline_hooks: dict[str, list] = {event: [] for event in PIPELINE_EVENTS}
 
-        for i, recipient in enumerate(targets, start=1):
+
+def on_pipeline_event(event: str, handler=None):
+    """발송 단계 이벤트 핸들러 등록. @on_pipeline_event('smtp_sent') 처럼 데코레이터로도 사용"""
+    if event not in _pipeline_hooks:
+        raise ValueError(f'알 수 없는 이벤트: {event}')
+
+    def register(fn):
+        _pipeline_hooks[event].append(fn)
+        return fn
+
+    return register(handler) if handler is not None else register
+
+
+def remove_pipeline_hook(event: str, handler):
+    if handler in _pipeline_hooks.get(event, ()):
+        _pipeline_hooks[event].remove(handler)
+
+
+def _emit(event: str, run_id: str, started: float | None = None, **info):
+    handlers = _pipeline_hooks[event]
+    if not handlers:
+        return
+    if started is not None:
+        info['seconds'] = time.perf_counter() - started
+    for handler in handlers:
+        # 진단용 핸들러의 오류로 발송이 멈추지 않게 함
+        try:
+            handler(run_id, **info)
+        except Exception:
+            app.logger.exception('발송 이벤트 핸들러 오류 (%s)', event)
+
+
+def _profile_path(run_id: str, ext: str) -> str:
+    return os.path.join(PROFILES_DIR, f'{run_id}.{ext}')
+
+
+class _MessageProfiler:
+    """PROFILE_EVERY번째 메시지마다 생성~SMTP 전송 구간을 cProfile로 재고, 청크가 끝나면 run별 .prof에 합침"""
+
+    def __init__(self, every: int):
+        self.every = max(1, every)
+        self.count = 0
+        self.local = threading.local()
+
+    def message_start(self, run_id, **info):
+        self.count += 1
+        if self.count % self.every:
+            return
+        if getattr(self.local, 'profile', None) is None:
+            self.local.profile = cProfile.Profile()
+        self.local.active = True
+        self.local.profile.enable()
+
+    def smtp_sent(self, run_id, **info):
+        if getattr(self.local, 'active', False):
+            self.local.profile.disable()
+            self.local.active = False
+
+    def run_finish(self, run_id, **info):
+        profile = getattr(self.local, 'profile', None)
+        if profile is None:
+            return
+        self.smtp_sent(run_id)
+        self.local.profile = None
+        path = _profile_path(run_id, 'prof')
+        stats = pstats.Stats(profile)
+        if os.path.exists(path):
+            stats.add(path)
+        stats.dump_stats(path)
+
+
+class _StackSampler:
+    """청크를 실행하는 스레드의 스택을 주기적으로 샘플링해 run별 collapsed stack 파일(.folded)에 누적.
+    flamegraph.pl이나 speedscope로 볼 수 있음"""
+
+    def __init__(self, interval_ms: float):
+        self.interval = max(0.001, interval_ms / 1000)
+        self.local = threading.local()
+
+    def run_start(self, run_id, **info):
+        counts: dict[str, int] = {}
+        stop = threading.Event()
+        target = threading.get_ident()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                if stack:
+                    key = ';'.join(reversed(stack))
+                    counts[key] = counts.get(key, 0) + 1
+
+        thread = threading.Thread(target=sample, name='stack-sampler', daemon=True)
+        thread.start()
+        self.local.state = (stop, thread, counts)
+
+    def run_finish(self, run_id, **info):
+        state = getattr(self.local, 'state', None)
+        if state is None:
+            return
+        self.local.state = None
+        stop, thread, counts = state
+        stop.set()
+        thread.join()
+        path = _profile_path(run_id, 'folded')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, _, n = line.rstrip('\n').rpartition(' ')
+                    if key:
+                        counts[key] = counts.get(key, 0) + int(n)
+        with open(path, 'w', encoding='utf-8') as f:
+            for key, n in counts.items():
+                f.write(f'{key} {n}\n')
+
+
+def enable_pipeline_profiler(mode: str) -> bool:
+    """내장 프로파일러를 발송 이벤트에 등록 ('message' 또는 'sample')"""
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    if mode == 'message':
+        profiler = _MessageProfiler(PROFILE_EVERY)
+        on_pipeline_event('message_start', profiler.message_start)
+        on_pipeline_event('smtp_sent', profiler.smtp_sent)
+        on_pipeline_event('run_finish', profiler.run_finish)
+        return True
+    if mode == 'sample':
+        sampler = _StackSampler(PROFILE_SAMPLE_MS)
+        on_pipeline_event('run_start', sampler.run_start)
+        on_pipeline_event('run_finish', sampler.run_finish)
+        return True
+    return False
+
+
+class _NullSMTP:
+    """드라이런용 SMTP: 메시지 생성/서명까지는 모두 하고 전송만 생략 (보낸 양만 셈)"""
+
+    sock = None
+
+    def __init__(self):
+        self.transactions = 0
+        self.recipients = 0
+        self.bytes = 0
+
+    def sendmail(self, from_addr, to_addrs, msg, mail_options=(), rcpt_options=()):
+        self.transactions += 1
+        self.recipients += len(to_addrs)
+        self.bytes += len(msg)
+        return {}
+
+
+def _peak_rss_kb() -> int:
+    """워커 프로세스가 시작한 뒤의 최대 RSS. 프로세스 전체 값이라 이 run 이전/동시 작업의 메모리도 포함됨"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS는 바이트 단위
+
+
+def record_dry_run_chunk(run_id: str, sink: _NullSMTP, wall_seconds: float, cpu_seconds: float):
+    """드라이런 청크 하나의 측정값을 run에 누적 (청크마다 다른 워커가 처리해도 합산됨)"""
+    def update(conn):
+        row = conn.execute("SELECT dry_run_stats FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+        stats = json.loads(row['dry_run_stats']) if row and row['dry_run_stats'] else {}
+        stats['chunks'] = stats.get('chunks', 0) + 1
+        stats['messages'] = stats.get('messages', 0) + sink.recipients
+        stats['transactions'] = stats.get('transactions', 0) + sink.transactions
+        stats['bytes'] = stats.get('bytes', 0) + sink.bytes
+        stats['wall_seconds'] = stats.get('wall_seconds', 0) + wall_seconds
+        stats['cpu_seconds'] = stats.get('cpu_seconds', 0) + cpu_seconds
+        stats['peak_rss_kb'] = max(stats.get('peak_rss_kb', 0), _peak_rss_kb())
+        conn.execute("UPDATE send_runs SET dry_run_stats = ? WHERE id = ?", (json.dumps(stats), run_id))
+
+    db_write(update)
+
+
+def dry_run_report(stats_json: str | None) -> dict | None:
+    """누적 측정값 -> 초당 메시지 수, 메시지당 CPU 시간(워커 프로세스, DB writer 포함)/크기, 워커 프로세스 최대 RSS"""
+    if not stats_json:
+        return None
+    stats = json.loads(stats_json)
+    messages = stats.get('messages') or 0
+    transactions = stats.get('transactions') or 0
+    wall = stats.get('wall_seconds') or 0
+    return {
+        'chunks': stats.get('chunks', 0),
+        'messages': messages,
+        'transactions': transactions,
+        'msgs_per_sec': messages / wall if wall else 0,
+        'cpu_ms_per_msg': stats.get('cpu_seconds', 0) * 1000 / messages if messages else 0,
+        # 묶음 발송은 DATA 한 번에 여러 수신자가 실리므로 메시지 크기는 트랜잭션 기준
+        'bytes_per_msg': stats.get('bytes', 0) / transactions if transactions else 0,
+        'total_bytes': stats.get('bytes', 0),
+        'peak_rss_mb': stats.get('peak_rss_kb', 0) / 1024,
+    }
+
+
+def _deliver(run_id: str, run: dict, targets: list[str], inline_images: dict[str, str], config: dict, attempts: dict[str, int], heartbeat=None, sink: _NullSMTP | None = None) -> str:
+    """targets에게 발송하고 수신자별 상태를 기록.
+
+    'done' / 'canceled'(취소 요청) / 'lease_lost'(다른 워커가 run을 넘겨받음) 중 하나를 반환
+    """
+    template_id = run.get('template_id') or ''
+    html = run.get('html_content') or ''
+    from_email = run.get('from_email') or ''
+    subject = run.get('subject') or ''
+
+    # 개인화되지 않은 본문은 도메인별로 묶어 한 트랜잭션에 여러 RCPT TO로 발송
+    batch_size = int(run.get('rcpt_batch_size') or 0)
+    if batch_size > 1:
+        batches = _group_recipients_by_domain(targets, batch_size)
+    else:
+        batches = [[r] for r in targets]
+
+    # 본문(이미지 포함)과 DKIM 본문 해시는 run마다 한 번만 만들고, 수신자마다 To 헤더와 헤더 서명만 새로 붙임
+    head, body, bh = _run_payload(run_id, subject, from_email, html, template_id, inline_images)
+    envelope_from = parseaddr(from_email)[1] or from_email
+    payload = None
+    if batch_size > 1:
+        # 수신자 주소는 봉투(RCPT TO)에만 싣고 헤더에는 노출하지 않음 (Bcc 방식)
+        payload = _compose_message(head, body, bh, from_email, 'undisclosed-recipients:;')
+
+    with (nullcontext(sink) if sink is not None else smtp_session(config)) as server:
+        since_refresh = 0
+        for batch in batches:
+            if heartbeat is not None and not heartbeat():
+                return 'lease_lost'
             if get_run_status(run_id) == 'cancel_requested':
-                server.quit()
+                return 'canceled'
+
+            _emit('message_start', run_id, recipients=len(batch))
+            started = time.perf_counter()
+            if payload is not None:
+                # 묶음 발송 본문은 run마다 한 번 만들어 두므로 생성 구간은 0에 가깝고 크기만 의미 있음
+                _emit('message_built', run_id, started, bytes=len(payload))
+                started = time.perf_counter()
+                results = _send_multi_rcpt(server, from_email, batch, payload)
+            else:
+                recipient = batch[0]
+                try:
+                    raw = _compose_message(head, body, bh, from_email, recipient)
+                    _emit('message_built', run_id, started, bytes=len(raw))
+                    started = time.perf_counter()
+                    server.sendmail(envelope_from, [parseaddr(recipient)[1] or recipient], raw)
+                    results = [SendResult(recipient, 'sent', sent_at=_now_iso())]
+                except Exception as e:
+                    results = [SendResult.failure(recipient, e)]
+            if _pipeline_hooks['smtp_sent']:
+                _emit('smtp_sent', run_id, started, recipients=len(batch), ok=sum(1 for r in results if r.status == 'sent'))
+
+            started = time.perf_counter()
+            update_recipient_statuses(run_id, [_with_retry_schedule(r, attempts) for r in results])
+            _emit('status_written', run_id, started, count=len(results))
+
+            since_refresh += len(batch)
+            if since_refresh >= 10:
+                refresh_run_counts(run_id)
+                since_refresh = 0
+
+        return 'done'
+
+
+def background_send_run(run_id: str, retry_only: bool = False, resume: bool = False):
+    """이전 버전 형식으로 큐에 들어간 작업 호환용: 청크 발송으로 위임"""
+    if retry_only:
+        requeue_failed_recipients(run_id)
+    background_send_chunk(run_id)
+
+
+def _lease_deadline() -> str:
+    return (datetime.now() + timedelta(seconds=RUN_LEASE_TTL)).isoformat()
+
+
+def start_run_lease(run_id: str, owner: str) -> bool:
+    """lease가 비었거나 만료된 경우에만 run을 running으로 바꾸고 lease를 획득"""
+    now = _now_iso()
+    updated = db_execute(
+        """
+        UPDATE send_runs
+           SET status = 'running',
+               started_at = COALESCE(started_at, ?),
+               lease_owner = ?,
+               lease_expires_at = ?
+         WHERE id = ?
+           AND status IN ('queued', 'scheduled', 'running')
+           AND (lease_owner IS NULL OR lease_expires_at < ?)
+        """,
+        (now, owner, _lease_deadline(), run_id, now),
+    )
+    return updated == 1
+
+
+def renew_run_lease(run_id: str, owner: str) -> bool:
+    updated = db_execute(
+        "UPDATE send_runs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ?",
+        (_lease_deadline(), run_id, owner),
+    )
+    return updated == 1
+
+
+def take_retry_lease(run_id: str, owner: str) -> bool:
+    """자동 재시도용 lease. 상태는 그대로 두고, 끝난 run의 lease가 비었거나 만료된 경우에만 획득
+
+    수동 재발송(reset_run_for_execution)과 같은 lease 칸을 두고 다투므로 둘이 같은 수신자를 동시에 보내지 않음
+    """
+    now = _now_iso()
+    updated = db_execute(
+        """
+        UPDATE send_runs
+           SET lease_owner = ?,
+               lease_expires_at = ?
+         WHERE id = ?
+           AND status IN ('finished', 'failed')
+           AND archived_at IS NULL
+           AND (lease_owner IS NULL OR lease_expires_at < ?)
+        """,
+        (owner, _lease_deadline(), run_id, now),
+    )
+    return updated == 1
+
+
+def release_run_lease(run_id: str, owner: str):
+    db_execute(
+        "UPDATE send_runs SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+        (run_id, owner),
+    )
+
+
+class _LeaseHeartbeat:
+    """청크를 처리하는 동안 별도 스레드에서 TTL/3 간격으로 lease를 갱신.
+
+    배치 사이가 아니라 시간 기준으로 갱신하므로 묶음 발송이나 느린 릴레이로 배치 하나가 TTL을 넘겨도
+    lease가 만료되지 않음(= reaper가 같은 수신자를 다른 워커에 넘기지 않음). 호출하면 lease 유지 여부를 돌려줌
+    """
+
+    def __init__(self, run_id: str, owner: str):
+        self.run_id = run_id
+        self.owner = owner
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name='lease-heartbeat', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while not self.stopped.wait(RUN_LEASE_TTL / 3):
+            try:
+                if not renew_run_lease(self.run_id, self.owner):
+                    self.lost = True
+                    return
+            except Exception as e:
+                # DB 오류는 다음 주기에 다시 시도 (계속 실패하면 lease가 만료되어 다음 갱신에서 lost가 됨)
+                app.logger.warning('lease 갱신 실패 %s: %s', self.run_id, e)
+
+    def __call__(self) -> bool:
+        return not self.lost
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+def reap_expired_runs() -> list[str]:
+    """lease가 없거나 만료됐고 큐에도 청크 작업이 없는 run(워커 OOM/재배포, 작업 유실 등)을
+    남은 pending 수신자부터 다시 큐에 넣음"""
+    now = _now_iso()
+    conn = get_db()
+    rows = conn.execute(
+        """
+        SELECT id, status, priority, chunk_job_id
+          FROM send_runs
+         WHERE status IN ('queued', 'scheduled', 'running', 'cancel_requested')
+           AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+        """,
+        (now,),
+    ).fetchall()
+    conn.close()
+
+    resumed = []
+    for row in rows:
+        run_id = row['id']
+        if _is_job_alive(row['chunk_job_id']):
+            continue
+        if row['status'] == 'cancel_requested':
+            if release_run_lease_if_expired(run_id, now, 'canceled'):
                 refresh_run_counts(run_id)
                 set_run_status(run_id, 'canceled', finished_at=_now_iso())
-                return
+            continue
+        if not release_run_lease_if_expired(run_id, now, row['status']):
+            continue
+        try:
+            enqueue_run_chunk(run_id, row['priority'])
+            resumed.append(run_id)
+        except Exception as e:
+            app.logger.warning('run 재개 등록 실패 %s: %s', run_id, e)
+    return resumed
+
+
+def _is_job_alive(job_id: str | None) -> bool:
+    if not job_id:
+        return False
+    try:
+        job = Job.fetch(job_id, connection=get_queue().connection)
+    except NoSuchJobError:
+        return False
+    return job.get_status() in ('queued', 'scheduled', 'deferred', 'started')
+
+
+def release_run_lease_if_expired(run_id: str, now: str, status: str) -> bool:
+    updated = db_execute(
+        """
+        UPDATE send_runs
+           SET status = ?,
+               lease_owner = NULL,
+               lease_expires_at = NULL
+         WHERE id = ?
+           AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+        """,
+        (status, run_id, now),
+    )
+    return updated == 1
+
+
+def has_active_runs() -> bool:
+    conn = get_db()
+    row = conn.execute(
+        "SELECT 1 FROM send_runs WHERE status IN ('queued', 'scheduled', 'running', 'cancel_requested') LIMIT 1"
+    ).fetchone()
+    conn.close()
+    return row is not None
+
+
+def schedule_reaper():
+    """활성 run이 있는 동안 RUN_LEASE_TTL 간격으로 reaper 작업을 예약 (Redis 키로 중복 예약 방지)"""
+    q = get_queue('transactional')
+    if q.connection.set(REAPER_LOCK_KEY, '1', nx=True, ex=RUN_LEASE_TTL * 2):
+        q.enqueue_in(timedelta(seconds=RUN_LEASE_TTL), 'app.reaper_job')
+
+
+def _schedule_reaper_quietly():
+    try:
+        schedule_reaper()
+    except Exception as e:
+        app.logger.warning('reaper 예약 실패: %s', e)
+
+
+def reaper_job():
+    get_queue('transactional').connection.delete(REAPER_LOCK_KEY)
+    reap_expired_runs()
+    if has_active_runs():
+        schedule_reaper()
+
+
+def _is_paced(run: dict) -> bool:
+    return bool(run.get('scheduled_at') or run.get('window_end') or run.get('daily_start'))
+
+
+def _parse_hhmm(value: str) -> datetime:
+    return datetime.strptime(value, '%H:%M')
+
+
+def _next_allowed_time(t: datetime, daily_start: str | None, daily_end: str | None) -> datetime:
+    """t가 허용 시간대(daily_start~daily_end, 서버 로컬 시각) 밖이면 다음 시작 시각으로 미룸"""
+    if not (daily_start and daily_end):
+        return t
+    start = _parse_hhmm(daily_start).time()
+    end = _parse_hhmm(daily_end).time()
+    if start <= t.time() < end:
+        return t
+    day = t.date() if t.time() < start else t.date() + timedelta(days=1)
+    return datetime.combine(day, start)
+
+
+def _allowed_seconds(start: datetime, end: datetime, daily_start: str | None, daily_end: str | None) -> float:
+    """start~end 사이에서 허용 시간대에 속하는 초"""
+    if end <= start:
+        return 0.0
+    if not (daily_start and daily_end):
+        return (end - start).total_seconds()
+    ds = _parse_hhmm(daily_start).time()
+    de = _parse_hhmm(daily_end).time()
+    total = 0.0
+    day = start.date()
+    while day <= end.date():
+        ws = max(start, datetime.combine(day, ds))
+        we = min(end, datetime.combine(day, de))
+        if we > ws:
+            total += (we - ws).total_seconds()
+        day += timedelta(days=1)
+    return total
+
+
+def _run_chunk_size(run: dict) -> int:
+    weight = int(run.get('weight') or 1)
+    return RUN_CHUNK_SIZE * max(1, min(weight, RUN_MAX_WEIGHT))
+
+
+def _next_release_at(run: dict, remaining: int, now: datetime) -> datetime:
+    """남은 수신자를 window_end까지 허용 시간대에 고르게 나눠 보내도록 다음 청크 시각 계산"""
+    daily_start, daily_end = run.get('daily_start'), run.get('daily_end')
+    t = now
+    if run.get('window_end') and remaining > 0:
+        seconds_left = _allowed_seconds(now, datetime.fromisoformat(run['window_end']), daily_start, daily_end)
+        chunks_left = -(-remaining // _run_chunk_size(run))
+        t = now + timedelta(seconds=seconds_left / chunks_left)
+    return _next_allowed_time(t, daily_start, daily_end)
 
+
+def fetch_pending_recipients(run_id: str, limit: int) -> list[dict]:
+    conn = get_db()
+    rows = conn.execute(
+        f"""
+        SELECT {_RCPT_EMAIL_SQL} AS recipient_email, r.attempt_count, r.address_id
+          FROM run_recipients r
+          {_RCPT_JOIN_SQL}
+         WHERE r.run_seq = {_RUN_SEQ_SQL} AND r.status = {RCPT_PENDING}
+         ORDER BY r.position ASC
+         LIMIT ?
+        """,
+        (run_id, limit),
+    ).fetchall()
+    conn.close()
+    _remember_address_ids(rows)
+    return [{'recipient_email': r['recipient_email'], 'attempt_count': r['attempt_count']} for r in rows]
+
+
+def count_pending_recipients(run_id: str) -> int:
+    conn = get_db()
+    row = conn.execute(
+        f"SELECT COUNT(*) AS n FROM run_recipients WHERE run_seq = {_RUN_SEQ_SQL} AND status = {RCPT_PENDING}",
+        (run_id,),
+    ).fetchone()
+    conn.close()
+    return int(row['n'] or 0)
+
+
+def set_run_next_release(run_id: str, status: str, next_release_at: str | None):
+    db_execute(
+        "UPDATE send_runs SET status = ?, next_release_at = ? WHERE id = ?",
+        (status, next_release_at, run_id),
+    )
+
+
+def requeue_failed_recipients(run_id: str):
+    """수동 재발송: 실패한 수신자를 다시 pending으로 돌려 청크 발송 대상에 포함"""
+    db_execute(
+        f"""
+        UPDATE run_recipients
+           SET status = {RCPT_PENDING}, next_attempt_at = NULL
+         WHERE run_seq = {_RUN_SEQ_SQL} AND status = {RCPT_FAILED}
+        """,
+        (run_id,),
+    )
+
+
+def enqueue_run_chunk(run_id: str, priority: str = 'bulk', at: datetime | None = None):
+    """run의 다음 청크 작업을 우선순위 큐의 맨 뒤(at이 있으면 예약 시각)에 등록"""
+    job_id = f'chunk-{run_id}-{uuid.uuid4().hex[:8]}'
+    db_execute("UPDATE send_runs SET chunk_job_id = ? WHERE id = ?", (job_id, run_id))
+
+    q = get_queue(priority)
+    if at is None:
+        q.enqueue('app.background_send_chunk', run_id, job_id=job_id)
+    else:
+        q.enqueue_at(at, 'app.background_send_chunk', run_id, job_id=job_id)
+
+
+def enqueue_run(run_id: str, run: dict):
+    """새 run을 큐에 등록. 예약/분산 발송이면 첫 청크를 예약 시각(허용 시간대 반영)에 등록"""
+    priority = run.get('priority') or 'bulk'
+    if not _is_paced(run):
+        enqueue_run_chunk(run_id, priority)
+        return
+    start = datetime.now()
+    if run.get('scheduled_at'):
+        start = max(start, datetime.fromisoformat(run['scheduled_at']))
+    start = _next_allowed_time(start, run.get('daily_start'), run.get('daily_end'))
+    set_run_next_release(run_id, 'scheduled', start.isoformat())
+    enqueue_run_chunk(run_id, priority, at=start)
+
+
+def background_send_chunk(run_id: str):
+    """pending 수신자를 한 청크 발송하고, 남은 수신자가 있으면 다음 청크를 등록
+
+    일반 run은 같은 우선순위 큐의 맨 뒤로 다시 들어가 다른 run과 번갈아 처리되고,
+    예약/분산 발송 run은 일정에 맞춘 시각에 예약됨
+    """
+    run = fetch_run(run_id)
+    if not run:
+        return
+    if run['status'] == 'cancel_requested':
+        refresh_run_counts(run_id)
+        set_run_status(run_id, 'canceled', finished_at=_now_iso())
+        return
+    if run['status'] not in ('queued', 'scheduled', 'running'):
+        return
+
+    inline_images, missing = _resolve_inline_images(run.get('template_id') or '', run.get('html_content') or '')
+    if missing:
+        err = '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)
+        mark_all_recipients_failed(run_id, err)
+        refresh_run_counts(run_id)
+        set_run_status(run_id, 'failed', finished_at=_now_iso())
+        return
+
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    if not start_run_lease(run_id, owner):
+        return
+    _schedule_reaper_quietly()
+    heartbeat = _LeaseHeartbeat(run_id, owner)
+    _emit('run_start', run_id)
+
+    # 드라이런은 SMTP 전송만 빼고 같은 경로(수신자 조회, MIME/DKIM, 상태 기록)를 그대로 거치며 측정
+    sink = _NullSMTP() if run.get('dry_run') else None
+    # CPU는 프로세스 전체로 셈 (상태 기록은 DB writer 스레드가 하므로 작업 스레드만 재면 그 비용이 빠짐)
+    started, cpu_started = time.perf_counter(), time.process_time()
+    outcome = 'failed'
+    final = False
+    relay_down = False
+    try:
+        rows = fetch_pending_recipients(run_id, _run_chunk_size(run))
+        targets = [r['recipient_email'] for r in rows]
+        attempts = {r['recipient_email']: int(r['attempt_count'] or 0) for r in rows}
+        _emit('targets_fetched', run_id, started, count=len(targets))
+        outcome = 'done'
+        if targets:
             try:
-                msg = build_email_message(
-                    subject=subject,
-                    from_email=from_email,
-                    recipient=recipient,
-                    html=html,
-                    template_id=template_id,
-                    strict_inline=True,
-                    inline_images=inline_images,
-                )
-                server.send_message(msg)
-                update_recipient_status(run_id, recipient, 'sent', error=None, sent_at=_now_iso())
+                outcome = _deliver(run_id, run, targets, inline_images, load_config(), attempts, heartbeat=heartbeat, sink=sink)
+            except (SMTPSessionError, DKIMKeyError) as e:
+                if isinstance(e, SMTPSessionError) and not e.permanent:
+                    # 연결 거부/421 등 일시적 장애: 이번 청크만 재시도 예약하고 다음 청크는 늦춰 등록
+                    relay_down = True
+                    update_recipient_statuses(run_id, [
+                        _with_retry_schedule(SendResult.failure(r, e), attempts) for r in targets
+                    ])
+                else:
+                    # 인증 실패(535) 등 5xx나 DKIM 키 오류는 다음 청크도 똑같이 실패하므로 청크를 더 등록하지 않고 run을 멈춤
+                    outcome = 'session_failed'
+                    mark_all_recipients_failed(run_id, str(e))
             except Exception as e:
-                update_recipient_status(run_id, recipient, 'failed', error=str(e), sent_at=None)
+                # 릴레이 장애는 이번 청크만 실패(재시도 예약) 처리하고 일정은 계속 진행
+                update_recipient_statuses(run_id, [
+                    _with_retry_schedule(SendResult.failure(r, e), attempts) for r in targets
+                ])
+
+        if outcome == 'lease_lost':
+            return
+        refresh_run_counts(run_id)
+        if sink is not None and targets:
+            record_dry_run_chunk(run_id, sink, time.perf_counter() - started, time.process_time() - cpu_started)
+        if outcome == 'canceled':
+            final = True
+            clear_run_retries(run_id)
+            set_run_status(run_id, 'canceled', finished_at=_now_iso())
+            return
+        if outcome == 'session_failed':
+            final = True
+            set_run_status(run_id, 'failed', finished_at=_now_iso())
+            return
+
+        remaining = count_pending_recipients(run_id)
+        if remaining == 0:
+            final = True
+            set_run_status(run_id, 'finished', finished_at=_now_iso())
+            _schedule_retry_sweep_quietly()
+            return
+
+        # 다음 청크를 집은 워커가 start_run_lease에서 튕기지 않도록 등록 전에 lease를 먼저 놓음
+        # (finally에서 다시 놓는 것은 owner가 다르면 아무 일도 하지 않음)
+        heartbeat.stop()
+        release_run_lease(run_id, owner)
+
+        priority = run.get('priority') or 'bulk'
+        next_at = _next_release_at(run, remaining, datetime.now()) if _is_paced(run) else None
+        if relay_down:
+            # 릴레이가 돌아올 시간을 두고 다음 청크를 보냄 (바로 보내면 남은 수신자가 모두 같은 오류로 시도 횟수만 소모)
+            backoff = datetime.now() + timedelta(seconds=RETRY_BASE_DELAY)
+            next_at = max(next_at or backoff, backoff)
+        if next_at:
+            set_run_next_release(run_id, 'scheduled', next_at.isoformat())
+            enqueue_run_chunk(run_id, priority, at=next_at)
+        else:
+            enqueue_run_chunk(run_id, priority)
+    finally:
+        heartbeat.stop()
+        release_run_lease(run_id, owner)
+        _emit('run_finish', run_id, started, outcome=outcome, final=final)
+
+
+def cancel_scheduled_run(run_id: str) -> bool:
+    """다음 청크를 기다리는(scheduled) run은 워커를 거치지 않고 바로 취소"""
+    updated = db_execute(
+        "UPDATE send_runs SET status = 'canceled', finished_at = ?, next_release_at = NULL WHERE id = ? AND status = 'scheduled'",
+        (_now_iso(), run_id),
+    )
+    return updated == 1
+
+
+def _smtp_error_code(exc: Exception) -> int | None:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        for code, _ in exc.recipients.values():
+            return code
+        return None
+    return getattr(exc, 'smtp_code', None)
+
 
-            if i % 10 == 0:
-                refresh_run_counts(run_id)
+def _is_transient_failure(code: int | None, exc: Exception | None = None) -> bool:
+    """4xx 응답 또는 응답 코드 없는 네트워크 장애만 일시적 실패로 분류 (5xx는 영구 실패)"""
+    if code is not None:
+        return 400 <= code < 500
+    return isinstance(exc, OSError)
 
-        server.quit()
-        refresh_run_counts(run_id)
-        set_run_status(run_id, 'finished', finished_at=_now_iso())
 
-    except Exception as e:
-        err = str(e)
-        mark_all_recipients_failed(run_id, err)
-        refresh_run_counts(run_id)
-        set_run_status(run_id, 'failed', finished_at=_now_iso())
+def _next_attempt_at(code: int | None, exc: Exception | None, attempt_count: int) -> str | None:
+    """다음 자동 재시도 시각 (지수 백오프 + 지터). 재시도하지 않으면 None"""
+    if not _is_transient_failure(code, exc) or attempt_count >= RETRY_MAX_ATTEMPTS:
+        return None
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** max(attempt_count - 1, 0)))
+    delay *= 0.5 + random.random() / 2
+    return (datetime.now() + timedelta(seconds=delay)).isoformat()
+
+
+def _with_retry_schedule(result: SendResult, attempts: dict[str, int]) -> tuple:
+    """발송 결과를 상태 갱신 튜플 (recipient, status, error, sent_at, next_attempt_at)로 변환"""
+    next_attempt_at = None
+    if result.status == 'failed':
+        attempt_count = attempts.get(result.recipient, 0) + 1
+        next_attempt_at = _next_attempt_at(result.code, result.exc, attempt_count)
+    return (result.recipient, result.status, result.error, result.sent_at, next_attempt_at)
 
 
 def upsert_run_recipients(run_id: str, recipients: list[str]):
     if not recipients:
         return
-    now = _now_iso()
-    rows = [(run_id, email, 'pending', now) for email in recipients]
-    conn = get_db()
-    conn.executemany(
-        """
-        INSERT INTO send_recipients (run_id, recipient_email, status, updated_at)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(run_id, recipient_email) DO NOTHING
-        """,
-        rows,
-    )
-    conn.commit()
-    conn.close()
-
+    now = int(time.time())
+
+    def insert(conn):
+        row = conn.execute(
+            """
+            SELECT s.seq, COALESCE(MAX(r.position), -1) + 1 AS next_position
+              FROM send_runs s
+              LEFT JOIN run_recipients r ON r.run_seq = s.seq
+             WHERE s.id = ?
+            """,
+            (run_id,),
+        ).fetchone()
+        ids = _intern_addresses(conn, recipients)
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO run_recipients (run_seq, address_id, position, status, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (row['seq'], ids[email], row['next_position'] + i, RCPT_PENDING, now)
+                for i, email in enumerate(recipients)
+            ],
+        )
+
+    db_write(insert)
+
+
+def update_recipient_status(run_id: str, recipient: str, status: str, error: str | None = None, sent_at: str | None = None, next_attempt_at: str | None = None):
+    update_recipient_statuses(run_id, [(recipient, status, error, sent_at, next_attempt_at)])
+
+
+def update_recipient_statuses(run_id: str, updates: list[tuple]):
+    """(recipient, status, error, sent_at, next_attempt_at) 목록을 한 트랜잭션으로 반영"""
+    if not updates:
+        return
+    now = int(time.time())
 
-def update_recipient_status(run_id: str, recipient: str, status: str, error: str | None = None, sent_at: str | None = None):
-    now = _now_iso()
-    conn = get_db()
-    conn.execute(
-        """
-        UPDATE send_recipients
-           SET status = ?,
-               attempt_count = attempt_count + 1,
-               last_error = ?,
-               sent_at = ?,
-               updated_at = ?
-         WHERE run_id = ? AND recipient_email = ?
-        """,
-        (status, error, sent_at, now, run_id, recipient),
-    )
-    conn.commit()
-    conn.close()
+    def update(conn):
+        ids = {u[0]: _address_id_cache[u[0]] for u in updates if u[0] in _address_id_cache}
+        missing = [u[0] for u in updates if u[0] not in ids]
+        if missing:
+            ids.update(_intern_addresses(conn, missing, create=False))
+        conn.executemany(
+            f"""
+            UPDATE run_recipients
+               SET status = ?,
+                   attempt_count = attempt_count + 1,
+                   last_error = ?,
+                   sent_at = ?,
+                   updated_at = ?,
+                   next_attempt_at = ?
+             WHERE run_seq = {_RUN_SEQ_SQL} AND address_id = ? AND status != {RCPT_SENT}
+            """,
+            [
+                (RCPT_STATUS_CODES[status], error, _to_epoch(sent_at), now, _to_epoch(next_attempt_at), run_id, ids[recipient])
+                for recipient, status, error, sent_at, next_attempt_at in updates
+                if recipient in ids
+            ],
+        )
+
+    db_write(update)
 
 
 def refresh_run_counts(run_id: str):
-    conn = get_db()
-    cur = conn.execute(
-        """
-        SELECT
-          SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) AS success_count,
-          SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS fail_count,
-          SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) AS pending_count,
-          COUNT(*) AS total_count
-        FROM send_recipients
-        WHERE run_id = ?
-        """,
-        (run_id,),
-    )
-    row = cur.fetchone() or {}
-    success_count = int(row['success_count'] or 0)
-    fail_count = int(row['fail_count'] or 0)
-    total_count = int(row['total_count'] or 0)
-
-    conn.execute(
-        """
+    db_execute(
+        f"""
         UPDATE send_runs
-           SET total_count = ?,
-               success_count = ?,
-               fail_count = ?
+           SET total_count = (SELECT COUNT(*) FROM run_recipients WHERE run_seq = send_runs.seq),
+               success_count = (SELECT COUNT(*) FROM run_recipients WHERE run_seq = send_runs.seq AND status = {RCPT_SENT}),
+               fail_count = (SELECT COUNT(*) FROM run_recipients WHERE run_seq = send_runs.seq AND status = {RCPT_FAILED})
          WHERE id = ?
         """,
-        (total_count, success_count, fail_count, run_id),
+        (run_id,),
     )
-    conn.commit()
-    conn.close()
 
 
 def mark_run_finished(run_id: str, status: str = 'finished'):
     now = _now_iso()
-    conn = get_db()
-    conn.execute(
+    db_execute(
         """
         UPDATE send_runs
            SET finished_at = ?,
@@ -523,8 +2729,159 @@ def mark_run_finished(run_id: str, status: str = 'finished'):
         """,
         (now, status, run_id),
     )
-    conn.commit()
+
+
+def clear_run_retries(run_id: str):
+    db_execute(
+        f"UPDATE run_recipients SET next_attempt_at = NULL WHERE run_seq = {_RUN_SEQ_SQL} AND next_attempt_at IS NOT NULL",
+        (run_id,),
+    )
+
+
+# 자동 재시도는 실행 중이 아닌 run의 일시적 실패 수신자만 대상으로 함
+_RETRY_ELIGIBLE_SQL = f"""
+    r.status = {RCPT_FAILED}
+    AND s.status IN ('finished', 'failed')
+    AND s.archived_at IS NULL
+"""
+
+
+def claim_due_retries(limit: int) -> list[dict]:
+    """재시도 시각이 지난 수신자를 최대 limit 명 선점 (선점 시각만큼 next_attempt_at을 미룸)"""
+    now = int(time.time())
+    claim_until = now + RETRY_CLAIM_TTL
+
+    def claim(conn):
+        rows = conn.execute(
+            f"""
+            SELECT r.run_seq, r.address_id, s.id AS run_id,
+                   {_RCPT_EMAIL_SQL} AS recipient_email, r.attempt_count
+              FROM run_recipients r
+              JOIN send_runs s ON s.seq = r.run_seq
+              {_RCPT_JOIN_SQL}
+             WHERE r.next_attempt_at <= ?
+               AND {_RETRY_ELIGIBLE_SQL}
+             ORDER BY r.next_attempt_at
+             LIMIT ?
+            """,
+            (now, limit),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE run_recipients SET next_attempt_at = ? WHERE run_seq = ? AND address_id = ?",
+            [(claim_until, r['run_seq'], r['address_id']) for r in rows],
+        )
+        return [
+            {'run_id': r['run_id'], 'address_id': r['address_id'],
+             'recipient_email': r['recipient_email'], 'attempt_count': r['attempt_count']}
+            for r in rows
+        ]
+
+    return db_write(claim)
+
+
+def _still_failed(run_id: str, rows: list[dict]) -> list[dict]:
+    """선점 뒤 수동 재발송 등으로 상태가 바뀐 수신자를 빼고, 시도 횟수는 최신 값으로 바꿔 돌려줌"""
+    conn = get_db()
+    current = {
+        r['address_id']: r['attempt_count']
+        for r in conn.execute(
+            f"""
+            SELECT address_id, attempt_count
+              FROM run_recipients
+             WHERE run_seq = {_RUN_SEQ_SQL} AND status = {RCPT_FAILED}
+               AND address_id IN ({','.join('?' * len(rows))})
+            """,
+            (run_id, *[r['address_id'] for r in rows]),
+        )
+    }
     conn.close()
+    return [dict(r, attempt_count=current[r['address_id']]) for r in rows if r['address_id'] in current]
+
+
+def fetch_next_retry_at() -> str | None:
+    conn = get_db()
+    row = conn.execute(
+        f"""
+        SELECT MIN(r.next_attempt_at) AS next_at
+          FROM run_recipients r
+          JOIN send_runs s ON s.seq = r.run_seq
+         WHERE r.next_attempt_at IS NOT NULL
+           AND {_RETRY_ELIGIBLE_SQL}
+        """
+    ).fetchone()
+    conn.close()
+    return _from_epoch(row['next_at']) if row else None
+
+
+def schedule_retry_sweep():
+    """가장 이른 재시도 예정 시각에 재시도 작업을 RQ 예약 큐(sorted set)에 등록"""
+    next_at = fetch_next_retry_at()
+    if not next_at:
+        return
+    when = max(datetime.fromisoformat(next_at), datetime.now())
+    job_id = f'retry-sweep-{int(when.timestamp())}'
+    q = get_queue('transactional')
+    if Job.exists(job_id, connection=q.connection):
+        return
+    q.enqueue_at(when, 'app.process_due_retries', job_id=job_id)
+
+
+def _schedule_retry_sweep_quietly():
+    try:
+        schedule_retry_sweep()
+    except Exception as e:
+        app.logger.warning('재시도 예약 실패: %s', e)
+
+
+def process_due_retries():
+    """예정 시각이 지난 일시적 실패 수신자를 소량(RETRY_BATCH_SIZE)씩 재발송"""
+    claimed = claim_due_retries(RETRY_BATCH_SIZE)
+    by_run: dict[str, list[dict]] = {}
+    for row in claimed:
+        by_run.setdefault(row['run_id'], []).append(row)
+
+    config = load_config()
+    for run_id, rows in by_run.items():
+        run = fetch_run(run_id)
+        if not run:
+            continue
+        # 수동 재발송(/retry)과 겹치지 않도록 run lease를 잡은 뒤에만 보냄.
+        # 못 잡으면(재발송 중) 선점한 행은 그대로 두고, 재발송 청크가 보내거나 선점 TTL 뒤에 다시 집힘
+        owner = f'retry:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        if not take_retry_lease(run_id, owner):
+            continue
+        heartbeat = _LeaseHeartbeat(run_id, owner)
+        started = time.perf_counter()
+        outcome = 'failed'
+        emitted = False
+        try:
+            rows = _still_failed(run_id, rows)
+            if not rows:
+                continue
+            targets = [r['recipient_email'] for r in rows]
+            attempts = {r['recipient_email']: int(r['attempt_count'] or 0) for r in rows}
+
+            inline_images, missing = _resolve_inline_images(run.get('template_id') or '', run.get('html_content') or '')
+            # 재시도 묶음도 청크처럼 run_start/run_finish로 감싸 프로파일 등이 이 run에 기록되게 함
+            _emit('run_start', run_id)
+            emitted = True
+            try:
+                if missing:
+                    raise ValueError('인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing))
+                outcome = _deliver(run_id, run, targets, inline_images, config, attempts, heartbeat=heartbeat,
+                                   sink=_NullSMTP() if run.get('dry_run') else None)
+            except Exception as e:
+                update_recipient_statuses(run_id, [
+                    _with_retry_schedule(SendResult.failure(r, e), attempts) for r in targets
+                ])
+            refresh_run_counts(run_id)
+        finally:
+            heartbeat.stop()
+            release_run_lease(run_id, owner)
+            if emitted:
+                _emit('run_finish', run_id, started, outcome=outcome, final=False)
+
+    schedule_retry_sweep()
 
 
 def fetch_run_summaries() -> list[dict]:
@@ -537,7 +2894,9 @@ def fetch_run_summaries() -> list[dict]:
                total_count,
                success_count,
                fail_count,
-               status
+               status,
+               archived_at,
+               dry_run
           FROM send_runs
          ORDER BY created_at DESC
         """
@@ -547,66 +2906,405 @@ def fetch_run_summaries() -> list[dict]:
     return rows
 
 
-def fetch_run_detail(run_id: str) -> dict | None:
+def fetch_run(run_id: str) -> dict | None:
+    """수신자 목록 없이 run 정보만 조회"""
     conn = get_db()
-    run = conn.execute(
+    row = conn.execute(
         """
-        SELECT id,
-               template_id,
-               template_title AS title,
-               subject,
-               from_email,
-               html_content,
-               created_at,
-               started_at,
-               finished_at,
-               status,
-               total_count,
-               success_count,
-               fail_count
+        SELECT id, template_id, template_title AS title, subject, from_email, html_content,
+               status, rcpt_batch_size, scheduled_at, window_end, daily_start, daily_end,
+               priority, weight, body_hash, dry_run
           FROM send_runs
          WHERE id = ?
         """,
         (run_id,),
     ).fetchone()
+    conn.close()
+    return _with_run_body(dict(row)) if row else None
+
+
+_RUN_DETAIL_COLUMNS = """
+    id,
+    template_id,
+    template_title AS title,
+    subject,
+    from_email,
+    html_content,
+    created_at,
+    started_at,
+    finished_at,
+    status,
+    total_count,
+    success_count,
+    fail_count,
+    rcpt_batch_size,
+    scheduled_at,
+    window_end,
+    daily_start,
+    daily_end,
+    next_release_at,
+    priority,
+    weight,
+    body_hash,
+    archived_at,
+    dry_run,
+    dry_run_stats
+"""
+
+
+def _iter_recipient_rows(conn: sqlite3.Connection, run_id: str, status: str | None = None,
+                         positions: tuple[int, int] | None = None):
+    """run의 수신자 행을 입력 순서대로 기존 형식(주소/상태 문자열, ISO 시각)으로 하나씩 돌려줌
+
+    positions=(시작, 끝)이면 그 범위(끝 미포함)의 position만 읽음 (상세 화면 페이지)
+    """
+    status_sql = f"AND r.status = {RCPT_STATUS_CODES[status]}" if status else ''
+    params: tuple = (run_id,)
+    if positions:
+        status_sql += " AND r.position >= ? AND r.position < ?"
+        params += tuple(positions)
+    # sqlite3.Row -> dict 변환 대신 튜플에서 바로 dict를 만듦 (행이 많은 run의 전체 조회/내보내기에서 체감됨)
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        f"""
+        SELECT {_RCPT_EMAIL_SQL},
+               {_RCPT_STATUS_NAME_SQL},
+               r.last_error,
+               r.attempt_count,
+               r.sent_at,
+               r.next_attempt_at
+          FROM run_recipients r
+          {_RCPT_JOIN_SQL}
+         WHERE r.run_seq = {_RUN_SEQ_SQL} {status_sql}
+         ORDER BY r.position ASC
+        """,
+        params,
+    )
+    for email, status_name, last_error, attempt_count, sent_at, next_attempt_at in cur:
+        yield {
+            'recipient_email': email,
+            'status': status_name,
+            'last_error': last_error,
+            'attempt_count': attempt_count,
+            'sent_at': None if sent_at is None else _from_epoch(sent_at),
+            'next_attempt_at': None if next_attempt_at is None else _from_epoch(next_attempt_at),
+        }
+
+
+def _count_recipients(conn: sqlite3.Connection, run_id: str, *statuses: str) -> int:
+    """run에서 주어진 상태의 수신자 수 (idx_run_recipients_status만 읽음)"""
+    codes = ', '.join(str(RCPT_STATUS_CODES[s]) for s in statuses)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM run_recipients WHERE run_seq = {_RUN_SEQ_SQL} AND status IN ({codes})",
+        (run_id,),
+    ).fetchone()[0]
+
+
+def _position_span(conn: sqlite3.Connection, run_id: str) -> tuple[int, int] | None:
+    """run 수신자의 (최소, 최대) position"""
+    row = conn.execute(
+        f"SELECT MIN(position), MAX(position) FROM run_recipients WHERE run_seq = {_RUN_SEQ_SQL}",
+        (run_id,),
+    ).fetchone()
+    return None if row[0] is None else (row[0], row[1])
+
+
+def fetch_run_detail(run_id: str, page: int | None = None) -> dict | None:
+    """run 상세. page를 주면 수신자 행은 RESULT_PAGE_SIZE개 단위 한 페이지만 읽음 (없으면 전체)"""
+    conn = get_db()
+    run = conn.execute(
+        f"SELECT {_RUN_DETAIL_COLUMNS} FROM send_runs WHERE id = ?",
+        (run_id,),
+    ).fetchone()
 
     if not run:
         conn.close()
         return None
 
-    rec_cur = conn.execute(
-        """
-        SELECT recipient_email, status, last_error, attempt_count, sent_at
-          FROM send_recipients
-         WHERE run_id = ?
-         ORDER BY id ASC
-        """,
-        (run_id,),
-    )
-    recipient_rows = [dict(r) for r in rec_cur.fetchall()]
-    conn.close()
+    out = _with_run_body(dict(run))
+    page_count = 1
+    if out.get('archived_at') and os.path.exists(_archive_path(run_id)):
+        conn.close()
+        archived_run, recipient_rows = read_run_archive(run_id)
+        out['html_content'] = archived_run.get('html_content') or out.get('html_content')
+        pending_count = sum(1 for r in recipient_rows if r.get('status') == 'pending')
+        if page is not None:
+            page_count = max(1, -(-len(recipient_rows) // RESULT_PAGE_SIZE))
+            page = min(max(1, page), page_count)
+            recipient_rows = recipient_rows[(page - 1) * RESULT_PAGE_SIZE:page * RESULT_PAGE_SIZE]
+    elif page is not None:
+        # position은 run 안에서 입력 순서대로 매겨지므로 범위로 페이지를 나눔.
+        # 주소 조인은 그 페이지 행에만 일어남 (OFFSET은 건너뛰는 행까지 조인함)
+        span = _position_span(conn, run_id)
+        if span:
+            page_count = max(1, -(-(span[1] - span[0] + 1) // RESULT_PAGE_SIZE))
+            page = min(max(1, page), page_count)
+            start = span[0] + (page - 1) * RESULT_PAGE_SIZE
+            recipient_rows = list(_iter_recipient_rows(conn, run_id, positions=(start, start + RESULT_PAGE_SIZE)))
+        else:
+            page = 1
+            recipient_rows = []
+        pending_count = _count_recipients(conn, run_id, 'pending')
+        conn.close()
+    else:
+        recipient_rows = list(_iter_recipient_rows(conn, run_id))
+        conn.close()
+        pending_count = sum(1 for r in recipient_rows if r.get('status') == 'pending')
 
     errors = []
     for r in recipient_rows:
         if r.get('status') == 'failed' and r.get('last_error'):
             errors.append(f"{r['recipient_email']}: {r['last_error']}")
 
-    pending_count = sum(1 for r in recipient_rows if r.get('status') == 'pending')
-
-    out = dict(run)
     out['sent_at'] = out.get('finished_at') or out.get('started_at') or out.get('created_at')
+    out['dry_run_report'] = dry_run_report(out.pop('dry_run_stats', None))
     out['recipients'] = [r['recipient_email'] for r in recipient_rows]
     out['recipient_rows'] = recipient_rows
     out['errors'] = errors
     out['pending_count'] = pending_count
-    out['can_retry'] = out.get('status') not in ('queued', 'running', 'cancel_requested')
+    if page is not None:
+        out['page'] = page
+        out['page_count'] = page_count
+    # 이전 JSON에서 옮긴 결과(template_id 없음)는 본문이 없어 재발송 불가
+    out['can_retry'] = bool(out.get('template_id')) and not out.get('archived_at') and out.get('status') not in ('queued', 'scheduled', 'running', 'cancel_requested')
     return out
 
+
+def _archive_path(run_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f'{run_id}.jsonl.gz')
+
+
+def write_run_archive(run_id: str) -> str | None:
+    """run 정보(첫 줄)와 수신자 행(한 줄에 하나)을 gzip JSONL 파일로 저장"""
+    conn = get_db()
+    run = conn.execute(f"SELECT {_RUN_DETAIL_COLUMNS} FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+    if not run:
+        conn.close()
+        return None
+    path = _archive_path(run_id)
+    tmp_path = path + '.tmp'
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'run': _with_run_body(dict(run))}, ensure_ascii=False) + '\n')
+            for row in _iter_recipient_rows(conn, run_id):
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_archived_recipients(run_id: str, status: str | None = None):
+    with gzip.open(_archive_path(run_id), 'rt', encoding='utf-8') as f:
+        next(f, None)
+        for line in f:
+            row = json.loads(line)
+            if not status or row.get('status') == status:
+                yield row
+
+
+def read_run_archive(run_id: str) -> tuple[dict, list[dict]]:
+    """보관 파일에서 (run 정보, 수신자 행 목록)을 읽음"""
+    with gzip.open(_archive_path(run_id), 'rt', encoding='utf-8') as f:
+        run = json.loads(f.readline() or '{}').get('run') or {}
+    return run, list(iter_archived_recipients(run_id))
+
+
+EXPORT_COLUMNS = ('recipient_email', 'status', 'attempt_count', 'last_error', 'sent_at', 'next_attempt_at')
+EXPORT_FLUSH_ROWS = 1000
+
+
+def iter_run_export_rows(run_id: str, status: str | None = None):
+    """내보내기용 수신자 행. DB 커서(보관된 run은 보관 파일)에서 한 행씩 읽어 메모리 사용이 행 수와 무관함"""
+    conn = _connect_db()
+    try:
+        run = conn.execute("SELECT archived_at FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+        if run and run['archived_at'] and os.path.exists(_archive_path(run_id)):
+            yield from iter_archived_recipients(run_id, status)
+        else:
+            yield from _iter_recipient_rows(conn, run_id, status)
+    finally:
+        conn.close()
+
+
+def _encode_export_rows(rows, fmt: str):
+    """행을 CSV/JSONL 바이트 조각으로 바꿔 EXPORT_FLUSH_ROWS행마다 내보냄"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+
+    n = 0
+    for row in rows:
+        if fmt == 'csv':
+            writer.writerow([row.get(c) for c in EXPORT_COLUMNS])
+        else:
+            buf.write(json.dumps({c: row.get(c) for c in EXPORT_COLUMNS}, ensure_ascii=False) + '\n')
+        n += 1
+        if n % EXPORT_FLUSH_ROWS == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def _gzip_chunks(chunks):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip 헤더
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def _purge_run_rows(run_id: str):
+    """보관된 run의 수신자 행을 작은 배치로 지움 (배치마다 짧은 트랜잭션이라 다른 쓰기가 사이사이 들어감)"""
+    while True:
+        deleted = db_execute(
+            f"""
+            DELETE FROM run_recipients
+             WHERE run_seq = {_RUN_SEQ_SQL}
+               AND address_id IN (
+                   SELECT address_id FROM run_recipients WHERE run_seq = {_RUN_SEQ_SQL} LIMIT ?
+               )
+            """,
+            (run_id, run_id, ARCHIVE_DELETE_BATCH),
+        )
+        if deleted < ARCHIVE_DELETE_BATCH:
+            break
+
+    # 본문은 다른 run이 같은 내용을 참조하지 않을 때만 지움 (주소 행은 재사용되므로 남겨 둠)
+    def drop_body(conn):
+        row = conn.execute("SELECT body_hash FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+        conn.execute("UPDATE send_runs SET body_hash = NULL WHERE id = ?", (run_id,))
+        if row and row['body_hash']:
+            conn.execute(
+                "DELETE FROM run_bodies WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM send_runs WHERE body_hash = ?)",
+                (row['body_hash'], row['body_hash']),
+            )
+
+    db_write(drop_body)
+
+
+def archive_run(run_id: str) -> bool:
+    """완료된 run을 보관 상태로 바꾸고, 파일로 옮긴 뒤 DB 행을 지움. 중간에 멈췄던 run은 이어서 처리"""
+    def mark(conn):
+        updated = conn.execute(
+            """
+            UPDATE send_runs
+               SET archived_at = ?
+             WHERE id = ? AND archived_at IS NULL AND status IN ('finished', 'failed', 'canceled')
+            """,
+            (_now_iso(), run_id),
+        ).rowcount
+        row = conn.execute("SELECT archived_at FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+        if updated:
+            conn.execute(
+                f"UPDATE run_recipients SET next_attempt_at = NULL WHERE run_seq = {_RUN_SEQ_SQL} AND next_attempt_at IS NOT NULL",
+                (run_id,),
+            )
+        return bool(row and row['archived_at'])
+
+    if not db_write(mark):
+        return False
+    if not os.path.exists(_archive_path(run_id)):
+        write_run_archive(run_id)
+    _purge_run_rows(run_id)
+    return True
+
+
+def reclaim_free_pages() -> int:
+    """incremental_vacuum으로 빈 페이지를 조금씩 파일 시스템에 돌려줌. 돌려준 페이지 수를 반환"""
+    def step(conn):
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if free:
+            conn.execute(f'PRAGMA incremental_vacuum({ARCHIVE_VACUUM_PAGES})').fetchall()
+        return min(free, ARCHIVE_VACUUM_PAGES)
+
+    conn = get_db()
+    mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    conn.close()
+    if mode != 2:
+        return 0
+    total = 0
+    while True:
+        freed = db_write(step)
+        total += freed
+        if freed < ARCHIVE_VACUUM_PAGES:
+            return total
+
+
+def convert_to_incremental_vacuum():
+    """auto_vacuum이 꺼진 기존 DB를 INCREMENTAL로 전환 (전체 VACUUM 한 번, 그동안 쓰기는 대기)"""
+    conn = _connect_db()
+    lock_file = _open_host_write_lock()
+    try:
+        with _host_write_lock(lock_file):
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+    finally:
+        conn.close()
+        if lock_file is not None:
+            lock_file.close()
+
+
+def archive_old_runs(days: int, limit: int = 500) -> list[str]:
+    """완료 후 days일이 지난 run을 보관하고, 보관 중 멈췄던 run을 마저 정리한 뒤 빈 공간을 회수"""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    conn = get_db()
+    candidates = [r['id'] for r in conn.execute(
+        """
+        SELECT id FROM send_runs
+         WHERE archived_at IS NULL
+           AND status IN ('finished', 'failed', 'canceled')
+           AND COALESCE(finished_at, created_at) < ?
+         ORDER BY created_at
+         LIMIT ?
+        """,
+        (cutoff, limit),
+    )]
+    leftovers = [r['id'] for r in conn.execute(
+        """
+        SELECT s.id FROM send_runs s
+         WHERE s.archived_at IS NOT NULL
+           AND (s.body_hash IS NOT NULL OR EXISTS (SELECT 1 FROM run_recipients r WHERE r.run_seq = s.seq))
+        """
+    )]
+    conn.close()
+
+    archived = [run_id for run_id in candidates if archive_run(run_id)]
+    for run_id in leftovers:
+        archive_run(run_id)
+    reclaim_free_pages()
+    return archived
+
+
+def schedule_archiver():
+    """하루에 한 번 보관 작업을 대량 발송 큐에 예약 (Redis 키로 중복 예약 방지)"""
+    q = get_queue('bulk')
+    if q.connection.set(ARCHIVER_LOCK_KEY, '1', nx=True, ex=ARCHIVE_INTERVAL * 2):
+        q.enqueue_in(timedelta(seconds=ARCHIVE_INTERVAL), 'app.archiver_job')
+
+
+def archiver_job():
+    get_queue('bulk').connection.delete(ARCHIVER_LOCK_KEY)
+    if RETENTION_DAYS > 0:
+        archive_old_runs(RETENTION_DAYS)
+        schedule_archiver()
+
+
 # 설정 파일
 CONFIG_FILE = os.path.join(DATA_DIR, 'config.json')
 
+_config_cache: tuple[tuple[int, int], dict] | None = None
+
+
 def load_config():
-    """SMTP 설정 로드"""
+    """SMTP 설정 로드 (파일 mtime/크기가 그대로면 메모리 캐시 사용)"""
+    global _config_cache
     defaults = {
         'smtp_server': 'smtp.gmail.com',
         'smtp_port': 587,
@@ -615,19 +3313,27 @@ def load_config():
         'from_email': '',
         'test_recipient_email': ''
     }
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            for k, v in defaults.items():
-                config.setdefault(k, v)
-            return config
-        except Exception:
-            return defaults
-    return defaults
+    try:
+        st = os.stat(CONFIG_FILE)
+    except OSError:
+        return defaults
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _config_cache
+    if cached and cached[0] == stamp:
+        return dict(cached[1])
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        for k, v in defaults.items():
+            config.setdefault(k, v)
+    except Exception:
+        return defaults
+    _config_cache = (stamp, config)
+    return dict(config)
 
 def save_config(config):
     """SMTP 설정 저장"""
+    global _config_cache
     os.makedirs(DATA_DIR, exist_ok=True)
     tmp_path = f"{CONFIG_FILE}.tmp"
     with open(tmp_path, 'w', encoding='utf-8') as f:
@@ -635,6 +3341,7 @@ def save_config(config):
         f.flush()
         os.fsync(f.fileno())
     os.replace(tmp_path, CONFIG_FILE)
+    _config_cache = None
 
 
 def parse_email_list(value: str) -> list[str]:
@@ -670,6 +3377,8 @@ def save_template(template_id, title, subject, html_content, recipients, from_em
         'title': title,
         'subject': subject,
         'html_content': html_content,
+        # 발송에 쓰는 CSS 인라인/최소화 결과와 텍스트 본문 (원본은 편집용으로 그대로 둠)
+        'compiled': compile_template_html(html_content or ''),
         'recipients': recipients,
         'from_email': from_email,
         'created_at': datetime.now().isoformat(),
@@ -678,6 +3387,7 @@ def save_template(template_id, title, subject, html_content, recipients, from_em
     filepath = os.path.join(TEMPLATES_DIR, f'{template_id}.json')
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(template_data, f, ensure_ascii=False, indent=2)
+    invalidate_asset_cache(template_id)
 
 def load_template(template_id):
     """템플릿 로드"""
@@ -702,6 +3412,117 @@ def save_send_result(result_id, title, recipients, success_count, fail_count, er
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(result_data, f, ensure_ascii=False, indent=2)
 
+LEGACY_IMPORTED_KEY = 'legacy_results_imported_at'
+_legacy_results_imported = False
+
+
+def legacy_results_imported() -> bool:
+    """data/results/*.json을 DB로 모두 옮겼는지 (한 번 True가 되면 다시 조회하지 않음)"""
+    global _legacy_results_imported
+    if not _legacy_results_imported:
+        _legacy_results_imported = get_meta(LEGACY_IMPORTED_KEY) is not None
+    return _legacy_results_imported
+
+
+def _legacy_recipient_rows(result: dict) -> list[tuple[str, int, str | None]]:
+    """이전 JSON 결과의 수신자 목록과 'email: 오류' 문자열을 (주소, 상태 코드, 오류)로 변환"""
+    error_map = {}
+    for e in result.get('errors', []):
+        if ':' in e:
+            k, v = e.split(':', 1)
+            error_map[k.strip()] = v.strip()
+    rows = []
+    seen = set()
+    for email in result.get('recipients', []):
+        if email in seen:
+            continue
+        seen.add(email)
+        if email in error_map:
+            rows.append((email, RCPT_FAILED, error_map[email]))
+        else:
+            rows.append((email, RCPT_SENT, None))
+    return rows
+
+
+def import_legacy_results(batch_size: int = 200) -> tuple[int, list[str]]:
+    """data/results/*.json을 send_runs/run_recipients로 옮김. batch_size 파일마다 한 트랜잭션이고,
+    이미 옮긴 run id는 건너뛰므로 중간에 멈춰도 다시 실행하면 이어서 진행. (옮긴 수, 읽지 못한 파일) 반환"""
+    filenames = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith('.json'))
+    imported = 0
+    broken = []
+    cache: dict = {}
+
+    def insert(conn, results):
+        count = 0
+        for result, rows in results:
+            sent_at = result.get('sent_at') or _now_iso()
+            added = conn.execute(
+                """
+                INSERT OR IGNORE INTO send_runs (
+                    id, template_title, subject, from_email, html_content,
+                    created_at, started_at, finished_at, status,
+                    total_count, success_count, fail_count, seq
+                ) VALUES (
+                    ?, ?, ?, '', '', ?, ?, ?, 'finished', ?, ?, ?,
+                    (SELECT COALESCE(MAX(seq), 0) + 1 FROM send_runs)
+                )
+                """,
+                (
+                    result['id'],
+                    result.get('title') or '',
+                    result.get('title') or '',
+                    sent_at,
+                    sent_at,
+                    sent_at,
+                    len(result.get('recipients', [])),
+                    result.get('success_count') or 0,
+                    result.get('fail_count') or 0,
+                ),
+            ).rowcount
+            if not added:
+                continue
+            seq = conn.execute("SELECT seq FROM send_runs WHERE id = ?", (result['id'],)).fetchone()[0]
+            ids = _intern_addresses(conn, [r[0] for r in rows], cache=cache)
+            epoch = _to_epoch(sent_at)
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO run_recipients (
+                    run_seq, address_id, position, status, attempt_count, last_error, sent_at, updated_at
+                ) VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                """,
+                [
+                    (seq, ids[email], position, status, error, epoch if status == RCPT_SENT else None, epoch)
+                    for position, (email, status, error) in enumerate(rows, 1)
+                ],
+            )
+            count += 1
+        return count
+
+    for start in range(0, len(filenames), batch_size):
+        results = []
+        for filename in filenames[start:start + batch_size]:
+            try:
+                with open(os.path.join(RESULTS_DIR, filename), 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                result.setdefault('id', filename[:-5])
+                _to_epoch(result.get('sent_at'))  # 시각 형식이 깨진 파일도 여기서 걸러냄
+                rows = _legacy_recipient_rows(result)
+            except (OSError, ValueError, AttributeError, TypeError):
+                # 객체가 아닌 JSON(목록 등)이나 필드 형식이 다른 파일은 트랜잭션 밖에서 걸러냄
+                broken.append(filename)
+                continue
+            results.append((result, rows))
+        if results:
+            imported += db_write(lambda conn, results=results: insert(conn, results))
+
+    # 읽지 못한 파일이 남아 있으면 완료 표시를 하지 않아 목록/상세 화면이 계속 JSON 파일도 봄
+    if not broken:
+        set_meta(LEGACY_IMPORTED_KEY, _now_iso())
+        global _legacy_results_imported
+        _legacy_results_imported = True
+    return imported, broken
+
+
 def get_send_results():
     """발송 결과 목록 가져오기"""
     results = []
@@ -761,7 +3582,20 @@ def send_page(template_id):
         flash('템플릿을 찾을 수 없습니다.')
         return redirect(url_for('index'))
     config = load_config()
-    return render_template('send.html', template=template, template_id=template_id, config=config)
+    compiled = compiled_template(template)
+    size = estimate_message_size(template_id, template, compiled, template.get('from_email') or config.get('from_email') or '')
+    return render_template(
+        'send.html',
+        template=template,
+        template_id=template_id,
+        config=config,
+        max_rcpt_per_tx=SMTP_MAX_RCPT_PER_TX,
+        max_weight=RUN_MAX_WEIGHT,
+        compiled_html=compiled['html'],
+        html_bytes=len(compiled['html'].encode('utf-8')),
+        message_bytes=size,
+        html_clip_bytes=HTML_CLIP_BYTES,
+    )
 
 @app.route('/send/test', methods=['POST'])
 def send_test_email():
@@ -778,64 +3612,96 @@ def send_test_email():
 
     if not test_emails:
         return jsonify({'error': '설정에서 테스트 수신자 이메일을 먼저 입력해주세요.'}), 400
-    
-    # 메일 발송
+
+    # 인라인 이미지는 바로 검증해 즉시 피드백
+    _, missing = _resolve_inline_images(template_id, template.get('html_content') or '')
+    if missing:
+        return jsonify({'error': '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)}), 400
+
+    # 실제 발송은 워커의 test 우선순위 큐에서 처리 (웹 요청은 바로 반환)
     try:
-        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-        
-        # 인증이 필요한 경우에만 로그인
-        if config.get('smtp_user') and config.get('smtp_password'):
-            server.starttls()
-            server.login(config['smtp_user'], config['smtp_password'])
-        
-        success_count = 0
-        fail_count = 0
-        errors = []
+        job = get_queue('test').enqueue('app.background_send_test', template_id, test_emails, result_ttl=600)
+    except Exception as e:
+        return jsonify({'error': f'백그라운드 큐 등록 실패: {str(e)}'}), 500
 
-        inline_images, missing = _resolve_inline_images(template_id, template.get('html_content') or '')
-        if missing:
-            return jsonify({'error': '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)}), 400
+    return jsonify({'success': True, 'job_id': job.id, 'status': 'queued'})
 
-        for recipient in test_emails:
-            try:
-                from_email = template.get('from_email') or config['from_email']
-                test_html = template['html_content']
-                test_html = f"""
-                <div style="background-color: #f0f0f0; padding: 10px; margin-bottom: 20px; border-left: 4px solid #007bff;">
-                    <p style="margin: 0; color: #666;">⚠️ 이것은 테스트 메일입니다. 실제 발송이 아닙니다.</p>
-                </div>
-                {test_html}
-                """
 
-                msg = build_email_message(
-                    subject=f"[테스트] {template['subject']}",
-                    from_email=from_email,
-                    recipient=recipient,
-                    html=test_html,
-                    template_id=template_id,
-                    strict_inline=True,
-                    inline_images=inline_images,
-                )
+@app.route('/send/test/<job_id>')
+def send_test_status(job_id):
+    """테스트 발송 작업 상태/결과"""
+    try:
+        job = Job.fetch(job_id, connection=get_queue('test').connection)
+    except NoSuchJobError:
+        return jsonify({'error': '테스트 발송 작업을 찾을 수 없습니다.'}), 404
+
+    status = job.get_status()
+    status = getattr(status, 'value', status)
+    if status == 'finished':
+        result = job.result or {}
+        if result.get('error'):
+            return jsonify({'status': 'failed', 'error': result['error']})
+        return jsonify(dict(result, status='finished'))
+    if status in ('failed', 'stopped', 'canceled'):
+        return jsonify({'status': 'failed', 'error': '테스트 발송 작업이 실패했습니다.'})
+    return jsonify({'status': status})
+
+
+def background_send_test(template_id: str, test_emails: list[str]) -> dict:
+    """테스트 메일 발송 작업 (풀링된 SMTP 세션 사용)"""
+    template = load_template(template_id)
+    if not template:
+        return {'error': '템플릿을 찾을 수 없습니다.'}
 
-                server.send_message(msg)
-                success_count += 1
-            except Exception as e:
-                fail_count += 1
-                errors.append(f"{recipient}: {str(e)}")
+    config = load_config()
+    inline_images, missing = _resolve_inline_images(template_id, template.get('html_content') or '')
+    if missing:
+        return {'error': '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)}
 
-        server.quit()
+    success_count = 0
+    fail_count = 0
+    errors = []
 
-        overall_success = fail_count == 0
-        return jsonify({
-            'success': overall_success,
-            'success_count': success_count,
-            'fail_count': fail_count,
-            'errors': errors,
-            'message': f'테스트 메일 발송 완료 (성공 {success_count} / 실패 {fail_count})'
-        })
-        
+    try:
+        with smtp_session(config) as server:
+            for recipient in test_emails:
+                try:
+                    from_email = template.get('from_email') or config['from_email']
+                    test_html = compiled_template(template)['html']
+                    test_html = f"""
+                    <div style="background-color: #f0f0f0; padding: 10px; margin-bottom: 20px; border-left: 4px solid #007bff;">
+                        <p style="margin: 0; color: #666;">⚠️ 이것은 테스트 메일입니다. 실제 발송이 아닙니다.</p>
+                    </div>
+                    {test_html}
+                    """
+
+                    msg = build_email_message(
+                        subject=f"[테스트] {template['subject']}",
+                        from_email=from_email,
+                        recipient=recipient,
+                        html=test_html,
+                        template_id=template_id,
+                        strict_inline=True,
+                        inline_images=inline_images,
+                    )
+
+                    envelope_from = parseaddr(from_email)[1] or from_email
+                    raw = dkim_sign_message(_flatten_message(msg), from_email)
+                    server.sendmail(envelope_from, [parseaddr(recipient)[1] or recipient], raw)
+                    success_count += 1
+                except Exception as e:
+                    fail_count += 1
+                    errors.append(f"{recipient}: {str(e)}")
     except Exception as e:
-        return jsonify({'error': f'메일 발송 실패: {str(e)}'}), 500
+        return {'error': f'메일 발송 실패: {str(e)}'}
+
+    return {
+        'success': fail_count == 0,
+        'success_count': success_count,
+        'fail_count': fail_count,
+        'errors': errors,
+        'message': f'테스트 메일 발송 완료 (성공 {success_count} / 실패 {fail_count})'
+    }
 
 @app.route('/send', methods=['POST'])
 def send_email():
@@ -851,10 +3717,36 @@ def send_email():
     
     # 수신자 목록 파싱
     recipients = [email.strip() for email in recipients_text.split('\n') if email.strip()]
+
+    # 도메인별 묶음 발송(트랜잭션당 RCPT TO 수)
+    rcpt_batch_size = 0
+    if request.form.get('domain_batch'):
+        try:
+            rcpt_batch_size = int(request.form.get('rcpt_batch_size') or SMTP_MAX_RCPT_PER_TX)
+        except ValueError:
+            return jsonify({'error': '묶음 크기 값이 올바르지 않습니다.'}), 400
+        rcpt_batch_size = max(1, min(rcpt_batch_size, SMTP_MAX_RCPT_PER_TX))
+
+    # 예약/분산 발송
+    try:
+        pacing = _parse_pacing_form(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # 우선순위/가중치 (test는 테스트 발송 전용)
+    priority = request.form.get('priority') or 'bulk'
+    if priority not in RUN_PRIORITIES or priority == 'test':
+        return jsonify({'error': '우선순위 값이 올바르지 않습니다.'}), 400
+    try:
+        weight = max(1, min(int(request.form.get('weight') or 1), RUN_MAX_WEIGHT))
+    except ValueError:
+        return jsonify({'error': '가중치 값이 올바르지 않습니다.'}), 400
     
-    # 메일 발송(run 단위로 DB 저장)
+    # 메일 발송(run 단위로 DB 저장). 본문은 저장 시 컴파일한 HTML을 씀
+    template = dict(template, html_content=compiled_template(template)['html'])
     from_email = template.get('from_email') or config['from_email']
-    run_id = create_send_run(template_id, template, from_email, recipients)
+    dry_run = bool(request.form.get('dry_run'))
+    run_id = create_send_run(template_id, template, from_email, recipients, rcpt_batch_size=rcpt_batch_size, pacing=pacing, priority=priority, weight=weight, dry_run=dry_run)
     upsert_run_recipients(run_id, recipients)
 
     # 미리 검증(즉시 사용자에게 피드백)
@@ -868,8 +3760,7 @@ def send_email():
 
     # 백그라운드 enqueue
     try:
-        q = get_queue()
-        q.enqueue('app.background_send_run', run_id)
+        enqueue_run(run_id, dict(pacing, priority=priority))
     except Exception as e:
         err = f'백그라운드 큐 등록 실패: {str(e)}'
         mark_all_recipients_failed(run_id, err)
@@ -877,23 +3768,66 @@ def send_email():
         set_run_status(run_id, 'failed', finished_at=_now_iso())
         return jsonify({'error': err, 'result_id': run_id}), 500
 
-    return jsonify({'success': True, 'result_id': run_id, 'status': 'queued'})
+    return jsonify({'success': True, 'result_id': run_id, 'status': 'scheduled' if _is_paced(pacing) else 'queued'})
+
+
+def _parse_pacing_form(form) -> dict:
+    """발송 폼의 예약 시각/분산 시간/허용 시간대를 run 컬럼 값으로 변환"""
+    pacing = {}
+    scheduled_raw = (form.get('scheduled_at') or '').strip()
+    spread_raw = (form.get('spread_hours') or '').strip()
+    daily_start = (form.get('daily_start') or '').strip()
+    daily_end = (form.get('daily_end') or '').strip()
+
+    start = datetime.now()
+    if scheduled_raw:
+        try:
+            start = datetime.fromisoformat(scheduled_raw)
+        except ValueError:
+            raise ValueError('예약 시각 값이 올바르지 않습니다.')
+        pacing['scheduled_at'] = start.isoformat()
+
+    if spread_raw:
+        try:
+            spread_hours = float(spread_raw)
+        except ValueError:
+            raise ValueError('분산 시간 값이 올바르지 않습니다.')
+        if spread_hours <= 0:
+            raise ValueError('분산 시간은 0보다 커야 합니다.')
+        pacing['window_end'] = (max(start, datetime.now()) + timedelta(hours=spread_hours)).isoformat()
+
+    if daily_start or daily_end:
+        try:
+            if _parse_hhmm(daily_start) >= _parse_hhmm(daily_end):
+                raise ValueError
+        except ValueError:
+            raise ValueError('허용 시간대는 HH:MM 형식이며 시작이 종료보다 빨라야 합니다.')
+        pacing['daily_start'] = daily_start
+        pacing['daily_end'] = daily_end
+
+    return pacing
 
 
 @app.route('/result/<result_id>/retry', methods=['POST'])
 def retry_result(result_id):
     """실패/미발송(pending)만 재발송 (같은 run 내 중복 발송 방지)"""
-    detail = fetch_run_detail(result_id)
+    detail = fetch_run_detail(result_id, page=1)
     if not detail:
         return jsonify({'error': '결과를 찾을 수 없습니다.'}), 404
 
-    if detail.get('status') in ('queued', 'running', 'cancel_requested'):
+    if detail.get('status') in ('queued', 'scheduled', 'running', 'cancel_requested'):
         return jsonify({'error': '이미 발송 중인 작업입니다.'}), 400
+    if detail.get('archived_at'):
+        return jsonify({'error': '보관된 작업은 재발송할 수 없습니다.'}), 400
+    if not detail.get('template_id'):
+        return jsonify({'error': '이전 버전 결과는 재발송할 수 없습니다.'}), 400
 
     config = load_config()
 
-    # 재발송 대상: pending/failed
-    targets = [r['recipient_email'] for r in detail.get('recipient_rows', []) if r.get('status') in ('pending', 'failed')]
+    # 재발송 대상: pending/failed (수신자 행 전체를 읽지 않고 개수만 셈)
+    conn = get_db()
+    targets = _count_recipients(conn, result_id, 'pending', 'failed')
+    conn.close()
     if not targets:
         return jsonify({'success': True, 'message': '재발송 대상이 없습니다.'})
 
@@ -902,11 +3836,12 @@ def retry_result(result_id):
     if missing:
         return jsonify({'error': '인라인 이미지 파일을 찾을 수 없습니다: ' + ', '.join(missing)}), 400
 
-    reset_run_for_execution(result_id, status='queued')
+    if not reset_run_for_execution(result_id, status='queued'):
+        return jsonify({'error': '자동 재시도가 진행 중입니다. 잠시 후 다시 시도하세요.'}), 409
+    requeue_failed_recipients(result_id)
 
     try:
-        q = get_queue()
-        q.enqueue('app.background_send_run', result_id, True)
+        enqueue_run_chunk(result_id, detail.get('priority') or 'bulk')
     except Exception as e:
         set_run_status(result_id, 'failed', finished_at=_now_iso())
         return jsonify({'error': f'백그라운드 큐 등록 실패: {str(e)}'}), 500
@@ -914,6 +3849,33 @@ def retry_result(result_id):
     return jsonify({'success': True, 'message': '재발송 작업이 시작되었습니다.', 'result_id': result_id, 'status': 'queued'})
 
 
+@app.route('/result/<result_id>/export')
+def export_result(result_id):
+    """수신자별 결과를 CSV/JSONL로 스트리밍 (?format=csv|jsonl, ?status=failed|pending|sent, ?gzip=1)"""
+    fmt = (request.args.get('format') or 'csv').lower()
+    status = (request.args.get('status') or '').lower() or None
+    compress = (request.args.get('gzip') or '').lower() in ('1', 'true', 'yes', 'on')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'format은 csv 또는 jsonl이어야 합니다.'}), 400
+    if status and status not in RCPT_STATUS_CODES:
+        return jsonify({'error': 'status는 failed, pending, sent 중 하나여야 합니다.'}), 400
+    if not fetch_run(result_id):
+        return jsonify({'error': '결과를 찾을 수 없습니다.'}), 404
+
+    chunks = _encode_export_rows(iter_run_export_rows(result_id, status), fmt)
+    filename = f"{result_id}{'-' + status if status else ''}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(
+        chunks,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
 @app.route('/result/<result_id>/status')
 def result_status(result_id):
     s = fetch_run_status_summary(result_id)
@@ -928,35 +3890,58 @@ def cancel_result(result_id):
     if not st:
         return jsonify({'error': '결과를 찾을 수 없습니다.'}), 404
 
-    if st not in ('queued', 'running'):
+    if st not in ('queued', 'scheduled', 'running'):
         return jsonify({'error': '현재 상태에서는 취소할 수 없습니다.'}), 400
 
+    if st == 'scheduled' and cancel_scheduled_run(result_id):
+        clear_run_retries(result_id)
+        refresh_run_counts(result_id)
+        return jsonify({'success': True, 'status': 'canceled'})
+
     set_run_status(result_id, 'cancel_requested')
     return jsonify({'success': True, 'status': 'cancel_requested'})
 
 
 @app.route('/template/<template_id>/assets')
 def template_assets(template_id):
-    if not template_id:
+    if not _is_valid_template_id(template_id):
         return jsonify({'assets': []})
     return jsonify({'assets': _list_template_assets(template_id)})
 
 
 @app.route('/template/<template_id>/assets/view/<cid>')
 def view_template_asset(template_id, cid):
+    """템플릿 이미지 (`thumb=1`이면 썸네일). 내용 해시를 ETag로 보내 바뀌지 않았으면 304로 응답"""
     if not _is_valid_template_id(template_id) or not _is_valid_cid_key(cid):
         abort(404)
 
-    file_path = _find_inline_image_path(template_id, cid)
-    if not file_path:
+    found = _asset_entry(template_id, cid)
+    if not found:
         abort(404)
+    filename, entry = found
+
+    base = _get_template_assets_dir(template_id)
+    thumb = bool(request.args.get('thumb') and entry['thumb'])
+    version = _asset_version(entry, thumb=thumb)
+    if thumb:
+        file_path = os.path.join(base, ASSET_CACHE_SUBDIR, entry['thumb'])
+        etag = f'{version}-thumb'
+    else:
+        file_path = os.path.join(base, filename)
+        etag = version
 
-    return send_file(file_path)
+    # 목록이 붙여 주는 ?v=<버전> 주소는 내용(썸네일은 크기 설정도)이 바뀌면 주소도 바뀌므로 오래 캐시하고,
+    # 그 밖에는 매번 ETag로 확인
+    versioned = request.args.get('v') == version
+    response = send_file(file_path, etag=etag, max_age=ASSET_MAX_AGE if versioned else 0, conditional=True)
+    if versioned:
+        response.cache_control.immutable = True
+    return response
 
 
 @app.route('/template/<template_id>/assets/upload', methods=['POST'])
 def upload_template_asset(template_id):
-    if not template_id:
+    if not _is_valid_template_id(template_id):
         return jsonify({'error': '템플릿 ID가 필요합니다.'}), 400
 
     file = request.files.get('file')
@@ -982,6 +3967,8 @@ def upload_template_asset(template_id):
 
     file.save(tmp_path)
     os.replace(tmp_path, final_path)
+    invalidate_asset_cache(template_id)
+    _asset_index(template_id, refresh=True)  # 해시와 썸네일은 업로드할 때 한 번만 만듦
 
     return jsonify({'success': True, 'cid': cid, 'filename': os.path.basename(final_path)})
 
@@ -1009,6 +3996,8 @@ def delete_template_asset(template_id):
             os.remove(p)
             deleted = True
             break
+    invalidate_asset_cache(template_id)
+    _asset_index(template_id, refresh=True)
 
     if not deleted:
         return jsonify({'error': '파일을 찾을 수 없습니다.'}), 404
@@ -1018,15 +4007,19 @@ def delete_template_asset(template_id):
 def results():
     """발송 결과 목록"""
     db_results = fetch_run_summaries()
-    results = db_results if db_results else get_send_results()
+    # 이전 JSON 결과를 DB로 옮긴 뒤에는 파일을 훑지 않음
+    results = db_results if db_results or legacy_results_imported() else get_send_results()
     return render_template('results.html', results=results)
 
 @app.route('/result/<result_id>')
 def view_result(result_id):
     """발송 결과 상세 보기"""
-    detail = fetch_run_detail(result_id)
+    detail = fetch_run_detail(result_id, page=request.args.get('page', 1, type=int))
     if detail:
-        return render_template('result_detail.html', result=detail)
+        return render_template('result_detail.html', result=detail, exportable=True)
+    if legacy_results_imported():
+        flash('결과를 찾을 수 없습니다.')
+        return redirect(url_for('results'))
 
     filepath = os.path.join(RESULTS_DIR, f'{result_id}.json')
     if os.path.exists(filepath):
@@ -1034,19 +4027,10 @@ def view_result(result_id):
             result = json.load(f)
 
         # 기존 JSON 결과도 동일한 UI 구조로 맞추기
-        error_map = {}
-        for e in result.get('errors', []):
-            if ':' in e:
-                k, v = e.split(':', 1)
-                error_map[k.strip()] = v.strip()
-
-        recipient_rows = []
-        for email in result.get('recipients', []):
-            if email in error_map:
-                recipient_rows.append({'recipient_email': email, 'status': 'failed', 'last_error': error_map[email], 'attempt_count': 1, 'sent_at': None})
-            else:
-                recipient_rows.append({'recipient_email': email, 'status': 'sent', 'last_error': None, 'attempt_count': 1, 'sent_at': None})
-        result['recipient_rows'] = recipient_rows
+        result['recipient_rows'] = [
+            {'recipient_email': email, 'status': RCPT_STATUS_NAMES[status], 'last_error': error, 'attempt_count': 1, 'sent_at': None}
+            for email, status, error in _legacy_recipient_rows(result)
+        ]
         result['pending_count'] = 0
         result['total_count'] = len(result.get('recipients', []))
         result['can_retry'] = False
@@ -1112,6 +4096,109 @@ def test_smtp():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.cli.command('reap-runs')
+def reap_runs_command():
+    """lease가 만료된(워커가 죽은) run을 남은 pending 수신자부터 재개"""
+    resumed = reap_expired_runs()
+    print(f'재개된 run: {len(resumed)}건')
+
+
+@app.cli.command('worker')
+@click.option('--burst', is_flag=True, help='큐가 비면 종료')
+@click.option('--profile', type=click.Choice(['message', 'sample']), default=PROFILE_MODE or None, help='발송 프로파일을 data/profiles/에 run별로 저장')
+def worker_command(burst, profile):
+    """작업마다 포크하지 않는 상주 워커: Redis/SQLite/SMTP 연결과 설정/이미지 캐시를 작업 간에 유지"""
+    global DB_REUSE_CONNECTIONS, SMTP_POOL_ENABLED
+    DB_REUSE_CONNECTIONS = True
+    SMTP_POOL_ENABLED = True
+    load_config()
+    loaded = preload_asset_cache()
+    print(f'인라인 이미지 캐시: {loaded}개 파일')
+    if dkim_enabled():
+        try:
+            _load_dkim_key(DKIM_PRIVATE_KEY)
+        except DKIMKeyError as e:
+            raise click.ClickException(str(e))
+        print(f'DKIM 서명: s={DKIM_SELECTOR}')
+    if profile and enable_pipeline_profiler(profile):
+        print(f'프로파일링: {profile} -> {PROFILES_DIR}')
+    if RETENTION_DAYS > 0:
+        schedule_archiver()
+
+    queues = [get_queue(p) for p in RUN_PRIORITIES]
+    worker = SimpleWorker(queues, connection=get_redis())
+    worker.work(with_scheduler=True, burst=burst)
+
+
+@app.cli.command('import-legacy-results')
+def import_legacy_results_command():
+    """data/results/*.json 발송 결과를 DB로 옮김 (다시 실행하면 남은 파일만 처리)"""
+    imported, broken = import_legacy_results()
+    print(f'옮긴 결과: {imported}건')
+    for filename in broken:
+        print(f'읽지 못한 파일: {filename}')
+    if broken:
+        print('읽지 못한 파일이 있어 완료로 표시하지 않았습니다. 파일을 고치거나 옮긴 뒤 다시 실행하세요.')
+
+
+@app.cli.command('dry-run')
+@click.argument('template_id')
+@click.option('--count', type=int, default=10000, help='가상 수신자 수')
+@click.option('--domains', type=int, default=50, help='가상 수신자 도메인 수')
+@click.option('--batch', type=int, default=0, help='도메인별 묶음 발송 크기 (0이면 수신자마다 한 통)')
+@click.option('--wait/--no-wait', default=True, help='워커가 끝낼 때까지 기다렸다가 보고서 출력')
+def dry_run_command(template_id, count, domains, batch, wait):
+    """가상 수신자로 드라이런 run을 큐에 넣고, 워커가 처리한 성능 보고서를 출력"""
+    template = load_template(template_id)
+    if not template:
+        raise click.ClickException('템플릿을 찾을 수 없습니다.')
+    config = load_config()
+    recipients = [f'dryrun{i}@d{i % max(1, domains)}.example.invalid' for i in range(count)]
+    run_id = create_send_run(
+        template_id,
+        dict(template, html_content=compiled_template(template)['html']),
+        template.get('from_email') or config.get('from_email') or '',
+        recipients,
+        rcpt_batch_size=max(0, min(batch, SMTP_MAX_RCPT_PER_TX)),
+        dry_run=True,
+    )
+    upsert_run_recipients(run_id, recipients)
+    enqueue_run(run_id, {'priority': 'bulk'})
+    print(f'드라이런 run: {run_id}')
+    if not wait:
+        return
+
+    while get_run_status(run_id) in ('queued', 'scheduled', 'running'):
+        time.sleep(1)
+    conn = get_db()
+    row = conn.execute("SELECT dry_run_stats FROM send_runs WHERE id = ?", (run_id,)).fetchone()
+    conn.close()
+    report = dry_run_report(row['dry_run_stats'] if row else None)
+    if not report:
+        print(f'보고서 없음 (상태: {get_run_status(run_id)})')
+        return
+    print(f"메시지 {report['messages']}통 / 트랜잭션 {report['transactions']}회 / 청크 {report['chunks']}개")
+    print(f"초당 메시지: {report['msgs_per_sec']:.0f}")
+    print(f"메시지당 CPU: {report['cpu_ms_per_msg']:.2f}ms (워커 프로세스 전체, DB writer 스레드 포함)")
+    print(f"메시지당 크기: {report['bytes_per_msg'] / 1024:.1f}KB (전체 {report['total_bytes'] / 1024 / 1024:.1f}MB)")
+    print(f"워커 프로세스 최대 RSS: {report['peak_rss_mb']:.0f}MB (프로세스 전체, 이 run 이외 작업 포함)")
+
+
+@app.cli.command('archive-runs')
+@click.option('--days', type=int, default=None, help='완료 후 며칠이 지난 run을 보관할지 (기본 RETENTION_DAYS)')
+@click.option('--vacuum', is_flag=True, help='기존 DB를 auto_vacuum=INCREMENTAL로 전환 (전체 VACUUM 1회)')
+def archive_runs_command(days, vacuum):
+    """오래된 run을 data/archive/로 옮기고 DB 빈 공간을 조금씩 회수"""
+    if vacuum:
+        convert_to_incremental_vacuum()
+    days = RETENTION_DAYS if days is None else days
+    if days <= 0:
+        print('보관 기간이 설정되지 않았습니다 (--days 또는 RETENTION_DAYS).')
+        return
+    archived = archive_old_runs(days)
+    print(f'보관된 run: {len(archived)}건')
+
+
 if __name__ == '__main__':
     debug = (os.environ.get('FLASK_DEBUG') or '').lower() in ('1', 'true', 'yes', 'on')
     port = int(os.environ.get('PORT') or '5001')
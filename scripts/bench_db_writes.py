@@ -0,0 +1,127 @@
+"""SQLite 쓰기 경합 벤치마크: 호출 스레드에서 직접 쓰기 vs 프로세스별 writer 스레드(DB_WRITE_JOURNAL)
+
+워커 프로세스 N개 x 스레드 T개가 동시에 수신자 상태 갱신(10명 단위)과 run 카운트 갱신을 반복합니다.
+임시 DATA_DIR에서 실행하므로 data/app.db는 건드리지 않습니다.
+
+    python scripts/bench_db_writes.py --workers 8 --threads 4 --ops 200
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH = 10
+
+
+def _run_worker(worker_no: int, threads: int, ops: int, run_ids: list[str], out: mp.Queue):
+    sys.path.insert(0, ROOT)
+    import app
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def loop(thread_no: int):
+        local_lat = []
+        local_err = 0
+        for i in range(ops):
+            run_id = run_ids[(worker_no * threads + thread_no + i) % len(run_ids)]
+            start = (i * BATCH) % 100
+            updates = [(f'r{n}@example.com', 'failed', 'bench', None, None) for n in range(start, start + BATCH)]
+            t0 = time.perf_counter()
+            try:
+                app.update_recipient_statuses(run_id, updates)
+                if i % 10 == 0:
+                    app.refresh_run_counts(run_id)
+            except sqlite3.OperationalError:
+                local_err += 1
+                continue
+            local_lat.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local_lat)
+            errors.append(local_err)
+
+    ts = [threading.Thread(target=loop, args=(n,)) for n in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    out.put((latencies, sum(errors)))
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench(journal: bool, workers: int, threads: int, ops: int) -> dict:
+    ctx = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['DATA_DIR'] = data_dir
+        os.environ['DB_WRITE_JOURNAL'] = '1' if journal else '0'
+        # 스키마와 run 데이터는 자식과 같은 환경의 별도 프로세스에서 준비
+        prep = ctx.Queue()
+        p = ctx.Process(target=_prepare, args=(workers, prep))
+        p.start()
+        run_ids = prep.get()
+        p.join()
+
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_run_worker, args=(n, threads, ops, run_ids, out)) for n in range(workers)]
+        t0 = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        results = [out.get() for _ in procs]
+        elapsed = time.perf_counter() - t0
+        for proc in procs:
+            proc.join()
+
+    latencies = [v for lat, _ in results for v in lat]
+    return {
+        'journal': journal,
+        'ops': len(latencies),
+        'errors': sum(err for _, err in results),
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+    }
+
+
+def _prepare(runs: int, out: mp.Queue):
+    sys.path.insert(0, ROOT)
+    import app
+
+    run_ids = []
+    for _ in range(max(runs, 1)):
+        recipients = [f'r{n}@example.com' for n in range(100)]
+        run_id = app.create_send_run('bench', {'title': 'bench', 'subject': 'bench', 'html_content': '<p>bench</p>'}, 'bench@example.com', recipients)
+        app.upsert_run_recipients(run_id, recipients)
+        run_ids.append(run_id)
+    out.put(run_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8, help='동시 워커 프로세스 수')
+    parser.add_argument('--threads', type=int, default=4, help='프로세스당 쓰기 스레드 수')
+    parser.add_argument('--ops', type=int, default=200, help='스레드당 상태 갱신 횟수')
+    args = parser.parse_args()
+
+    print(f'workers={args.workers} threads={args.threads} ops={args.ops} (갱신당 {BATCH}명)')
+    print(f"{'mode':<8} {'ops':>7} {'errors':>7} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for journal in (False, True):
+        r = bench(journal, args.workers, args.threads, args.ops)
+        mode = 'journal' if journal else 'direct'
+        print(f"{mode:<8} {r['ops']:>7} {r['errors']:>7} {r['ops_per_sec']:>9.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""DKIM 서명 처리량 비교: 서명 끔 / run당 본문 해시 1회(현재 방식) / 메시지마다 본문 해시(단순 방식)
+
+임시 DATA_DIR에 인라인 이미지가 있는 템플릿과 임시 RSA 키를 만들고,
+SMTP 전송 없이 수신자별 메시지 바이트를 만드는 속도만 잽니다. data/는 건드리지 않습니다.
+
+    python scripts/bench_dkim.py --messages 2000 --image-kb 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HTML = """
+<html><body>
+  <h1>뉴스레터</h1>
+  <p>안녕하세요. 이번 달 소식을 전해 드립니다.</p>
+  <img src="cid:banner">
+  {paragraphs}
+</body></html>
+"""
+
+
+def _write_key(path: str, bits: int):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=bits)
+    with open(path, 'wb') as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+
+
+def _rate(fn, messages: int) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    size = 0
+    for i in range(messages):
+        size = len(fn(f'user{i}@example.com'))
+    return messages / (time.perf_counter() - t0), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000, help='만들 메시지 수')
+    parser.add_argument('--image-kb', type=int, default=300, help='인라인 이미지 크기(KB)')
+    parser.add_argument('--key-bits', type=int, default=2048, help='RSA 키 길이')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['DATA_DIR'] = data_dir
+        key_path = os.path.join(data_dir, 'dkim.pem')
+        _write_key(key_path, args.key_bits)
+        sys.path.insert(0, ROOT)
+        import app
+
+        template_id = 'bench'
+        os.makedirs(app._get_template_assets_dir(template_id), exist_ok=True)
+        with open(os.path.join(app._get_template_assets_dir(template_id), 'banner.png'), 'wb') as f:
+            f.write(os.urandom(args.image_kb * 1024))
+        html = HTML.format(paragraphs='\n'.join(f'<p>문단 {i}: 읽어 주셔서 감사합니다.</p>' for i in range(200)))
+        inline_images, _ = app._resolve_inline_images(template_id, html)
+        subject = '이번 달 소식'
+        from_email = 'news@example.com'
+
+        def compose(recipient, run_id):
+            head, body, bh = app._run_payload(run_id, subject, from_email, html, template_id, inline_images)
+            return app._compose_message(head, body, bh, from_email, recipient)
+
+        def naive(recipient):
+            msg = app.build_email_message(subject, from_email, recipient, html, template_id, inline_images=inline_images)
+            return app.dkim_sign_message(app._flatten_message(msg), from_email)
+
+        results = {}
+        app.DKIM_PRIVATE_KEY = ''
+        results['서명 끔'] = _rate(lambda r: compose(r, 'run-off'), args.messages)
+        app.DKIM_PRIVATE_KEY = key_path
+        app._load_dkim_key(key_path)
+        results['서명, run당 bh 1회'] = _rate(lambda r: compose(r, 'run-on'), args.messages)
+        results['서명, 메시지마다 bh'] = _rate(naive, args.messages)
+
+    print(f'메시지 {args.messages}개, 이미지 {args.image_kb}KB, RSA {args.key_bits}비트')
+    print(f"{'':<22} {'msgs/s':>10} {'KB/msg':>10}")
+    for name, (rate, size) in results.items():
+        print(f'{name:<22} {rate:>10.0f} {size / 1024:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
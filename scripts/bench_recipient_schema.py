@@ -0,0 +1,224 @@
+"""수신자 저장 구조 비교: 이전 send_recipients(주소/상태 문자열, ISO 시각) vs run_recipients(정수 코드, WITHOUT ROWID)
+
+임시 DATA_DIR에 이전 구조로 N행을 만든 뒤 크기와 조회/갱신 지연을 재고,
+app을 import해 마이그레이션한 다음 같은 작업을 다시 잽니다. data/app.db는 건드리지 않습니다.
+
+    python scripts/bench_recipient_schema.py --rows 10000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_SCHEMA = """
+CREATE TABLE send_runs (
+    id TEXT PRIMARY KEY,
+    template_id TEXT,
+    template_title TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    from_email TEXT NOT NULL,
+    html_content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    total_count INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    fail_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE send_recipients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    recipient_email TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempt_count INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sent_at TEXT,
+    updated_at TEXT NOT NULL,
+    next_attempt_at TEXT,
+    FOREIGN KEY(run_id) REFERENCES send_runs(id) ON DELETE CASCADE,
+    UNIQUE(run_id, recipient_email)
+);
+CREATE INDEX idx_send_recipients_run_status ON send_recipients(run_id, status);
+CREATE INDEX idx_send_recipients_next_attempt ON send_recipients(next_attempt_at) WHERE next_attempt_at IS NOT NULL;
+"""
+
+
+def _build_legacy(db_file: str, rows: int, run_size: int, seed: int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    domains = [f'mail{n}.example.com' for n in range(1000)]
+    pool = max(rows // 5, run_size)
+    base = datetime(2026, 1, 1)
+    conn = sqlite3.connect(db_file)
+    conn.executescript(LEGACY_SCHEMA)
+    run_ids = []
+    made = 0
+    while made < rows:
+        run_id = f'{len(run_ids):08d}-0000-4000-8000-000000000000'
+        run_ids.append(run_id)
+        n = min(run_size, rows - made)
+        conn.execute(
+            "INSERT INTO send_runs (id, template_id, template_title, subject, from_email, html_content, created_at, status, total_count)"
+            " VALUES (?, 'bench', 'bench', 'bench', 'bench@example.com', '', ?, 'finished', ?)",
+            (run_id, base.isoformat(), n),
+        )
+        start = rnd.randrange(pool)
+        batch = []
+        for i in range(n):
+            k = (start + i) % pool
+            email = f'user{k}@{domains[k % len(domains)]}'
+            at = (base + timedelta(seconds=made + i)).isoformat(timespec='microseconds')
+            r = rnd.random()
+            if r < 0.90:
+                batch.append((run_id, email, 'sent', 1, None, at, at, None))
+            elif r < 0.97:
+                batch.append((run_id, email, 'pending', 0, None, None, at, None))
+            else:
+                batch.append((run_id, email, 'failed', 1, '550 5.1.1 user unknown', None, at, None))
+        conn.executemany(
+            "INSERT INTO send_recipients (run_id, recipient_email, status, attempt_count, last_error, sent_at, updated_at, next_attempt_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.commit()
+        made += n
+    conn.execute('VACUUM')
+    conn.close()
+    return run_ids
+
+
+def _db_size(db_file: str) -> int:
+    conn = sqlite3.connect(db_file)
+    conn.execute('VACUUM')
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    conn.close()
+    return page_count * page_size
+
+
+def _timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def _legacy_ops(db_file: str, run_ids: list[str], rnd: random.Random) -> dict:
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+
+    def counts():
+        conn.execute(
+            "SELECT SUM(status = 'sent'), SUM(status = 'failed'), SUM(status = 'pending'), COUNT(*)"
+            " FROM send_recipients WHERE run_id = ?",
+            (rnd.choice(run_ids),),
+        ).fetchone()
+
+    def pending_chunk():
+        conn.execute(
+            "SELECT recipient_email, attempt_count FROM send_recipients"
+            " WHERE run_id = ? AND status = 'pending' ORDER BY id LIMIT 100",
+            (rnd.choice(run_ids),),
+        ).fetchall()
+
+    def fetch_and_update_chunk():
+        run_id = rnd.choice(run_ids)
+        emails = [r[0] for r in conn.execute(
+            "SELECT recipient_email FROM send_recipients WHERE run_id = ? AND status = 'pending' ORDER BY id LIMIT 100",
+            (run_id,),
+        )]
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "UPDATE send_recipients SET status = 'failed', attempt_count = attempt_count + 1, last_error = 'bench',"
+            " sent_at = NULL, updated_at = ?, next_attempt_at = NULL WHERE run_id = ? AND recipient_email = ? AND status != 'sent'",
+            [(now, run_id, e) for e in emails],
+        )
+        conn.commit()
+
+    def detail():
+        # 이전 fetch_run_detail과 같이 행을 dict로 바꾸는 비용까지 포함
+        rows = conn.execute(
+            "SELECT recipient_email, status, last_error, attempt_count, sent_at, next_attempt_at"
+            " FROM send_recipients WHERE run_id = ? ORDER BY id",
+            (rnd.choice(run_ids),),
+        )
+        [dict(r) for r in rows]
+
+    # 이전 상세 화면은 페이지 없이 전체 행을 그렸음
+    out = _measure(counts, pending_chunk, fetch_and_update_chunk, detail, detail)
+    conn.close()
+    return out
+
+
+def _compact_ops(app, run_ids: list[str], rnd: random.Random) -> dict:
+    def counts():
+        app.fetch_run_status_summary(rnd.choice(run_ids))
+
+    def pending_chunk():
+        app.fetch_pending_recipients(rnd.choice(run_ids), 100)
+
+    def fetch_and_update_chunk():
+        run_id = rnd.choice(run_ids)
+        emails = [r['recipient_email'] for r in app.fetch_pending_recipients(run_id, 100)]
+        app.update_recipient_statuses(run_id, [(e, 'failed', 'bench', None, None) for e in emails])
+
+    def detail():
+        app.fetch_run_detail(rnd.choice(run_ids))
+
+    def detail_page():
+        app.fetch_run_detail(rnd.choice(run_ids), page=rnd.randint(1, 100))
+
+    return _measure(counts, pending_chunk, fetch_and_update_chunk, detail, detail_page)
+
+
+def _measure(counts, pending_chunk, fetch_and_update_chunk, detail, detail_page) -> dict:
+    return {
+        'run counts': _timed(counts, 50),
+        'pending chunk (100)': _timed(pending_chunk, 50),
+        'fetch+update (100)': _timed(fetch_and_update_chunk, 50),
+        'detail rows (1 run)': _timed(detail, 5),
+        'detail page (1 run)': _timed(detail_page, 20),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='수신자 행 수')
+    parser.add_argument('--run-size', type=int, default=100_000, help='run 하나의 수신자 수')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_file = os.path.join(data_dir, 'app.db')
+        t0 = time.perf_counter()
+        run_ids = _build_legacy(db_file, args.rows, args.run_size)
+        print(f'이전 구조 생성: {args.rows:,}행 / run {len(run_ids)}개 ({time.perf_counter() - t0:.0f}s)')
+        before_size = _db_size(db_file)
+        before = _legacy_ops(db_file, run_ids, random.Random(2))
+
+        os.environ['DATA_DIR'] = data_dir
+        t0 = time.perf_counter()
+        sys.path.insert(0, ROOT)
+        import app  # import 시 init_db()가 마이그레이션 수행
+        app.DB_REUSE_CONNECTIONS = True  # 이전 구조 측정과 같이 연결 하나를 계속 사용
+        print(f'마이그레이션: {time.perf_counter() - t0:.0f}s')
+        after_size = _db_size(db_file)
+        after = _compact_ops(app, run_ids, random.Random(2))
+
+    print()
+    print(f"{'':<22} {'before':>12} {'after':>12}")
+    print(f"{'DB size (MB)':<22} {before_size / 1e6:>12.1f} {after_size / 1e6:>12.1f}")
+    for name in before:
+        print(f"{name + ' ms':<22} {before[name]:>12.2f} {after[name]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""웹 부하 테스트: 큰 DB를 만든 뒤 여러 운영자가 동시에 화면/API를 호출할 때의 처리량과 지연 분포
+
+임시 DATA_DIR에 템플릿과 run/수신자를 대량으로 만들고, Redis 큐는 메모리 가짜로 바꾼 다음
+`/`, `/results`, `/result/<id>`, `/result/<id>/status`, `/send`를 동시에 호출해 경로별 지연 백분위를 출력합니다.
+기본은 Flask test client, `--http`면 로컬 스레드 서버에 HTTP로 요청합니다. data/는 건드리지 않습니다.
+
+    python scripts/loadtest_web.py --runs 2000 --recipients 1000000 --clients 16 --duration 30
+"""
+import argparse
+import http.client
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 경로별 호출 비중 (상태 폴링이 가장 잦고 발송은 드묾)
+ROUTE_WEIGHTS = {
+    'GET /': 2,
+    'GET /results': 2,
+    'GET /result/<id>': 3,
+    'GET /result/<id>/status': 10,
+    'POST /send': 1,
+}
+
+TEMPLATE_HTML = """
+<html><head><style>p { color: #333; } .footer { font-size: 12px }</style></head>
+<body><h1>__TITLE__</h1>__PARAGRAPHS__<p class="footer">수신 거부</p></body></html>
+"""
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return False
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+
+class _FakeQueue:
+    """RQ Queue 대신 등록된 작업 수만 세는 가짜 (워커 없이 웹 계층만 측정)"""
+
+    connection = _FakeRedis()
+    jobs = 0
+    lock = threading.Lock()
+
+    def __init__(self, name):
+        self.name = name
+
+    def _add(self):
+        with _FakeQueue.lock:
+            _FakeQueue.jobs += 1
+        return type('Job', (), {'id': uuid.uuid4().hex})()
+
+    def enqueue(self, *args, **kwargs):
+        return self._add()
+
+    def enqueue_at(self, when, *args, **kwargs):
+        return self._add()
+
+    def enqueue_in(self, delay, *args, **kwargs):
+        return self._add()
+
+
+def _seed(app, runs: int, recipients: int, templates: int, seed: int = 1) -> tuple[list[str], list[str]]:
+    rnd = random.Random(seed)
+    template_ids = []
+    for n in range(templates):
+        template_id = f'tpl-{n:04d}'
+        paragraphs = ''.join(f'<p>문단 {i} 내용입니다.</p>' for i in range(30))
+        app.save_template(
+            template_id,
+            f'뉴스레터 {n}',
+            f'{n}월 소식',
+            TEMPLATE_HTML.replace('__TITLE__', f'뉴스레터 {n}').replace('__PARAGRAPHS__', paragraphs),
+            [f'user{i}@example.com' for i in range(20)],
+            'news@example.com',
+        )
+        template_ids.append(template_id)
+
+    per_run = max(1, recipients // max(1, runs))
+    pool = max(per_run, recipients // 5)
+    domains = [f'mail{n}.example.com' for n in range(500)]
+    base = datetime.now() - timedelta(days=90)
+
+    conn = sqlite3.connect(app.DB_FILE)
+    conn.execute('BEGIN')
+    conn.executemany("INSERT INTO email_domains (id, name) VALUES (?, ?)", [(i + 1, d) for i, d in enumerate(domains)])
+    conn.executemany(
+        "INSERT INTO email_addresses (id, domain_id, local_part) VALUES (?, ?, ?)",
+        ((k + 1, k % len(domains) + 1, f'user{k}') for k in range(pool)),
+    )
+    bodies = []
+    for n in range(min(templates, 20)):
+        body_hash = app._body_hash(f'body-{n}')
+        conn.execute(
+            "INSERT INTO run_bodies (hash, html_content, created_at) VALUES (?, ?, ?)",
+            (body_hash, app.load_template(template_ids[n])['compiled']['html'], base.isoformat()),
+        )
+        bodies.append(body_hash)
+
+    run_ids = []
+    for seq in range(1, runs + 1):
+        run_id = str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+        run_ids.append(run_id)
+        created = base + timedelta(minutes=seq * 60)
+        counts = [0, 0, 0]
+        start = rnd.randrange(pool)
+        rows = []
+        for position in range(1, per_run + 1):
+            r = rnd.random()
+            status = 1 if r < 0.9 else (2 if r < 0.97 else 0)
+            counts[status] += 1
+            at = int(created.timestamp()) + position
+            rows.append((
+                seq, (start + position) % pool + 1, position, status, 1 if status else 0,
+                '550 5.1.1 user unknown' if status == 2 else None,
+                at if status == 1 else None, at,
+            ))
+        conn.executemany(
+            "INSERT OR IGNORE INTO run_recipients (run_seq, address_id, position, status, attempt_count, last_error, sent_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute(
+            """
+            INSERT INTO send_runs (id, template_id, template_title, subject, from_email, html_content,
+                                   created_at, started_at, finished_at, status, total_count, success_count, fail_count,
+                                   body_hash, seq)
+            VALUES (?, ?, ?, ?, 'news@example.com', '', ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                run_id, rnd.choice(template_ids), '뉴스레터', '소식', created.isoformat(), created.isoformat(),
+                (created + timedelta(minutes=30)).isoformat(), 'finished' if counts[0] == 0 else 'running',
+                per_run, counts[1], counts[2], rnd.choice(bodies), seq,
+            ),
+        )
+        if seq % 200 == 0:
+            conn.commit()
+            conn.execute('BEGIN')
+    conn.commit()
+    conn.close()
+    return template_ids, run_ids
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _pick_request(rnd: random.Random, template_ids: list[str], run_ids: list[str]) -> tuple[str, str, str, dict | None]:
+    route = rnd.choices(list(ROUTE_WEIGHTS), weights=list(ROUTE_WEIGHTS.values()))[0]
+    if route == 'GET /':
+        return route, 'GET', '/', None
+    if route == 'GET /results':
+        return route, 'GET', '/results', None
+    if route == 'GET /result/<id>':
+        return route, 'GET', f'/result/{rnd.choice(run_ids)}', None
+    if route == 'GET /result/<id>/status':
+        return route, 'GET', f'/result/{rnd.choice(run_ids)}/status', None
+    form = {
+        'template_id': rnd.choice(template_ids),
+        'recipients': '\n'.join(f'load{rnd.randrange(10 ** 6)}@example.com' for _ in range(100)),
+    }
+    return route, 'POST', '/send', form
+
+
+def _client_loop(make_request, template_ids, run_ids, deadline, seed, out, lock):
+    rnd = random.Random(seed)
+    samples = []
+    errors = []
+    while time.perf_counter() < deadline:
+        route, method, path, form = _pick_request(rnd, template_ids, run_ids)
+        t0 = time.perf_counter()
+        try:
+            status = make_request(method, path, form)
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - t0
+        if 200 <= status < 400:
+            samples.append((route, elapsed))
+        else:
+            errors.append(route)
+    with lock:
+        out['samples'].extend(samples)
+        out['errors'].extend(errors)
+
+
+def _test_client_requester(app):
+    client = app.app.test_client()
+
+    def make_request(method, path, form):
+        if method == 'GET':
+            return client.get(path).status_code
+        return client.post(path, data=form).status_code
+
+    return make_request
+
+
+def _http_requester(port: int):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def make_request(method, path, form):
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+
+    return make_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=2000, help='만들 run 수')
+    parser.add_argument('--recipients', type=int, default=1_000_000, help='전체 수신자 행 수')
+    parser.add_argument('--templates', type=int, default=200, help='템플릿 수')
+    parser.add_argument('--clients', type=int, default=16, help='동시 클라이언트 수')
+    parser.add_argument('--duration', type=float, default=30, help='측정 시간(초)')
+    parser.add_argument('--http', action='store_true', help='로컬 스레드 서버에 HTTP로 요청')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['DATA_DIR'] = data_dir
+        sys.path.insert(0, ROOT)
+        import app
+
+        app.get_queue = lambda priority='bulk': _FakeQueue(app._queue_name(priority))
+        app.get_redis = lambda: _FakeQueue.connection
+
+        t0 = time.perf_counter()
+        template_ids, run_ids = _seed(app, args.runs, args.recipients, args.templates)
+        print(f'시드: 템플릿 {len(template_ids)}개 / run {len(run_ids)}개 / 수신자 {args.recipients:,}행 ({time.perf_counter() - t0:.0f}s)')
+
+        server = None
+        if args.http:
+            from werkzeug.serving import make_server
+
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)  # 요청마다 찍히는 접근 로그 끔
+            server = make_server('127.0.0.1', 0, app.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        out = {'samples': [], 'errors': []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.duration
+        threads = []
+        for n in range(args.clients):
+            make_request = _http_requester(server.server_port) if server else _test_client_requester(app)
+            threads.append(threading.Thread(
+                target=_client_loop,
+                args=(make_request, template_ids, run_ids, deadline, n, out, lock),
+            ))
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        if server:
+            server.shutdown()
+
+    by_route: dict[str, list[float]] = {}
+    for route, seconds in out['samples']:
+        by_route.setdefault(route, []).append(seconds * 1000)
+    errors = {route: out['errors'].count(route) for route in ROUTE_WEIGHTS}
+
+    print(f"클라이언트 {args.clients}개, {elapsed:.0f}s, {'HTTP' if args.http else 'test client'}, 큐 작업 {_FakeQueue.jobs}개")
+    print(f"{'route':<26} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for route in ROUTE_WEIGHTS:
+        lat = by_route.get(route, [])
+        print(
+            f'{route:<26} {len(lat):>7} {errors[route]:>5} {len(lat) / elapsed:>8.1f} '
+            f'{_percentile(lat, 50):>8.1f} {_percentile(lat, 95):>8.1f} {_percentile(lat, 99):>8.1f} {max(lat, default=0):>8.1f}'
+        )
+    total = len(out['samples'])
+    print(f"{'total':<26} {total:>7} {len(out['errors']):>5} {total / elapsed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""템플릿 컴파일(CSS 인라인, 텍스트 대체 본문) 테스트
+
+    pip install pytest && python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+# app은 import할 때 DATA_DIR에 DB/폴더를 만들므로 임시 폴더를 씀
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='webmailsender-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def compile_html(html: str) -> str:
+    return app.compile_template_html(html)['html']
+
+
+def test_simple_rules_are_inlined_and_style_block_removed():
+    out = compile_html('<html><head><style>p { color: red } .big { font-size: 20px }</style></head>'
+                       '<body><p class="big">hi</p></body></html>')
+    assert '<style' not in out
+    assert '<p class="big" style="color:red;font-size:20px">hi</p>' in out
+
+
+def test_conditional_comment_style_is_left_untouched():
+    mso = '<!--[if mso]><style>p { color: blue; }</style><![endif]-->'
+    out = compile_html(f'<html><head>{mso}<style>p {{ color: red }}</style></head><body><p>hi</p></body></html>')
+    assert mso in out
+    assert '<p style="color:red">hi</p>' in out
+
+
+def test_media_rules_are_kept_in_head():
+    out = compile_html('<html><head><title>t</title></head><body>'
+                       '<style>p { color: red } @media (max-width: 600px) { p { color: blue } }</style>'
+                       '<p>hi</p></body></html>')
+    head, _, body = out.partition('</head>')
+    assert '<style>@media (max-width: 600px){p { color: blue }}</style>' in head
+    assert '<style' not in body
+    assert '<p style="color:red">hi</p>' in body
+
+
+def test_pseudo_class_rules_are_kept_and_not_inlined():
+    out = compile_html('<html><head><style>a { color: red } a:hover { color: blue }</style></head>'
+                       '<body><a href="https://example.com">x</a></body></html>')
+    assert '<style>a:hover{color:blue}</style></head>' in out
+    assert 'style="color:red"' in out
+    assert 'color:blue"' not in out
+
+
+def test_without_head_kept_rules_stay_where_the_first_style_was():
+    out = compile_html('<p>a</p><style>a:hover { color: blue }</style><p>b</p>')
+    assert out.index('<p>a</p>') < out.index('<style>a:hover{color:blue}</style>') < out.index('<p>b</p>')
+
+
+def test_important_overrides_inline_style_and_specificity():
+    out = compile_html('<html><head><style>p { color: red !important } .x { color: green } '
+                       'p { margin: 0 }</style></head>'
+                       '<body><p class="x" style="color: black; margin: 4px">hi</p></body></html>')
+    assert 'color:red !important' in out
+    assert 'margin:4px' in out
+    assert 'color:black' not in out
+    assert 'color:green' not in out
+
+
+def test_inline_important_still_wins():
+    out = compile_html('<style>p { color: red !important }</style><p style="color: black !important">hi</p>')
+    assert 'color:black !important' in out
+
+
+def test_plain_text_keeps_pre_whitespace():
+    assert app._html_to_plain_text('<pre>  keep\n   this </pre>') == '  keep\n   this '
+    text = app._html_to_plain_text('<p>a   b</p><pre>\n x <b>y</b>\n\n  z</pre><p>c</p>')
+    assert text == 'a b\n\n x y\n\n  z\n\nc'
+
+
+def test_plain_text_collapses_whitespace_outside_pre():
+    text = app._html_to_plain_text('<h1>Title</h1>\n\n<p>hello\n   world <a href="https://example.com">link</a></p>'
+                                   '<ul><li>one</li><li>two</li></ul>')
+    assert text == 'Title\n\nhello world link (https://example.com)\n\n- one\n- two'
+
+
+def test_stored_text_is_used_only_while_template_matches_run_body(monkeypatch):
+    template = {'html_content': '<p>hello</p>'}
+    template['compiled'] = dict(app.compile_template_html(template['html_content']), text='stored text')
+    monkeypatch.setattr(app, 'load_template', lambda template_id: template)
+    assert app._stored_plain_text('tpl', template['compiled']['html']) == 'stored text'
+    assert app._stored_plain_text('tpl', '<p>edited later</p>') is None
+
+
+def test_descendant_rule_overrides_less_specific_simple_rule():
+    out = compile_html('<style>a { color: red } .footer a { color: gray }</style>'
+                       '<p><a href="#">x</a></p><div class="footer"><p><a href="#">y</a></p></div>')
+    assert '<a href="#" style="color:red">x</a>' in out
+    assert '<a href="#" style="color:gray">y</a>' in out
+    assert '<style' not in out
+
+
+def test_compound_descendant_rule_beats_simple_rule_by_specificity():
+    out = compile_html('<style>table td.x { padding: 8px } td { padding: 0 } ul > li { margin: 0 }</style>'
+                       '<table><tr><td class="x">a<td>b</tr></table><ul><li>c<li>d</ul><ol><li>e</li></ol>')
+    assert '<td class="x" style="padding:8px">a' in out
+    assert '<td style="padding:0">b' in out
+    assert out.count('<li style="margin:0">') == 2
+    assert '<li>e</li>' in out